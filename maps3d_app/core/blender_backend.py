@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import atexit
 import hashlib
+import importlib.util
 import json
 import os
 import pkgutil
@@ -8,17 +10,19 @@ import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
-from urllib.parse import urlencode
-from urllib.request import urlopen
 
 import numpy as np
-import rasterio
-from pyproj import Transformer
 
+from .dem_io import clipped_bbox_window, open_dem, read_dem_window
 from .gpx_loader import load_gpx_points
-from .pipeline import GenerateConfig, _compute_bbox, _model_horizontal_scale_mm_per_meter, estimate_relief_mm
+from .overpass import iter_overpass_elements
+from .pipeline import GenerateConfig, _compute_bbox, _lonlat_to_dem_points, _model_horizontal_scale_mm_per_meter
 
 
 def _resolve_blender_script_path() -> Path:
@@ -75,7 +79,9 @@ def _append_run_log(log_path: Path, content: str) -> None:
             fh.write("\n")
 
 
+@lru_cache(maxsize=1)
 def _autodetect_blender_exe() -> str | None:
+    # Scanned once per session; an explicit blender_exe_path always takes precedence.
     if os.name == "nt":
         roots = [Path("C:/Program Files/Blender Foundation"), Path("C:/Program Files (x86)/Blender Foundation")]
         candidates: list[Path] = []
@@ -89,7 +95,7 @@ def _autodetect_blender_exe() -> str | None:
 
 
 def _compute_dem_metrics(
-    gpx_path: str | Path,
+    points_lonlat: np.ndarray,
     dem_path: str | Path,
     params: GenerateConfig,
 ) -> tuple[
@@ -103,44 +109,39 @@ def _compute_dem_metrics(
     tuple[float, float, float, float],
     tuple[int, int],
 ]:
-    points_lonlat = load_gpx_points(gpx_path)
-    with rasterio.open(dem_path) as ds:
+    with open_dem(dem_path) as ds:
         if ds.crs is None:
             raise ValueError("Il DEM non ha CRS definito.")
-        to_dem = Transformer.from_crs("EPSG:4326", ds.crs, always_xy=True)
-        x_dem, y_dem = to_dem.transform(points_lonlat[:, 0], points_lonlat[:, 1])
-        points_dem = np.column_stack((x_dem, y_dem))
+        points_dem = _lonlat_to_dem_points(points_lonlat, ds.crs)
 
         minx, miny, maxx, maxy = _compute_bbox(points_dem, params.bbox_margin_ratio)
-        window = (
-            rasterio.windows.from_bounds(minx, miny, maxx, maxy, transform=ds.transform)
-            .round_offsets()
-            .round_lengths()
-        )
+        window = clipped_bbox_window(ds, minx, miny, maxx, maxy)
 
-        data = ds.read(1, window=window, masked=True)
-        if data.size == 0:
-            raise ValueError("Ritaglio DEM vuoto: controlla GPX e DEM.")
+        dem = np.empty((int(window.height), int(window.width)), dtype=np.float32)
+        read_dem_window(ds, window, out=dem)
 
-        # ✅ fix: converti a float PRIMA di filled(np.nan)
-        dem = np.asarray(data.astype(np.float64).filled(np.nan), dtype=np.float64)
-
-        valid_mask = ~np.asarray(data.mask) if np.ma.isMaskedArray(data) else np.isfinite(dem)
-        valid_mask &= np.isfinite(dem)
+        valid_mask = np.isfinite(dem)
+        if ds.nodata is not None:
+            valid_mask &= dem != np.float32(ds.nodata)
         if not np.any(valid_mask):
             raise ValueError("Ritaglio DEM privo di valori validi.")
 
-        z_min_src = float(np.min(dem[valid_mask]))
-        z_max_src = float(np.max(dem[valid_mask]))
-        dem_filled = np.where(valid_mask, dem, z_min_src)
+        z_min_src = float(np.min(dem, where=valid_mask, initial=np.inf))
+        z_max_src = float(np.max(dem, where=valid_mask, initial=-np.inf))
         z_range_src = max(z_max_src - z_min_src, 0.0)
-        normalized01 = (
-            np.zeros_like(dem_filled, dtype=np.float64)
-            if z_range_src <= 1e-12
-            else np.clip((dem_filled - z_min_src) / z_range_src, 0.0, 1.0)
-        )
 
-        rows, cols = dem_filled.shape
+        # Normalize the read buffer in place, then set invalid cells to 0 (= z_min_src).
+        if z_range_src <= 1e-12:
+            dem.fill(0.0)
+        else:
+            dem -= np.float32(z_min_src)
+            dem *= np.float32(1.0 / z_range_src)
+            np.clip(dem, 0.0, 1.0, out=dem)
+            if not valid_mask.all():
+                np.copyto(dem, np.float32(0.0), where=~valid_mask)
+        normalized01 = dem
+
+        rows, cols = dem.shape
         win_t = ds.window_transform(window)
         x_coords = win_t.c + (np.arange(cols) + 0.5) * win_t.a
         y_coords = win_t.f + (np.arange(rows) + 0.5) * win_t.e
@@ -195,68 +196,89 @@ def _fetch_osm_layers(points_lonlat: np.ndarray, model_w: float, model_h: float)
 );
 out geom;
 """
-    url = "https://overpass-api.de/api/interpreter?" + urlencode({"data": q})
-    layers = {"water": [], "green": [], "detail": []}
-    try:
-        payload = json.loads(urlopen(url, timeout=30).read().decode("utf-8"))
-    except Exception:
-        return layers
+    layers: dict[str, list[list[list[float]]]] = {"water": [], "green": [], "detail": []}
 
     dx = max(e - w, 1e-9)
     dy = max(n - s, 1e-9)
 
-    for el in payload.get("elements", []):
-        geom = el.get("geometry", [])
-        if len(geom) < 2:
-            continue
-        line = [[(p["lon"] - w) / dx * model_w, (p["lat"] - s) / dy * model_h] for p in geom]
-        tags = el.get("tags", {})
-        if tags.get("natural") == "water" or "waterway" in tags:
-            layers["water"].append(line)
-        elif tags.get("landuse") in {"forest", "meadow", "grass"} or tags.get("leisure") in {"park", "garden"}:
-            layers["green"].append(line)
-        elif tags.get("highway") in {"motorway", "trunk", "primary"}:
-            layers["detail"].append(line)
+    try:
+        for el in iter_overpass_elements(q, timeout_s=30):
+            geom = el.get("geometry", [])
+            if len(geom) < 2:
+                continue
+            coords = np.fromiter(
+                (c for p in geom for c in (p["lon"], p["lat"])), dtype=np.float64, count=2 * len(geom)
+            ).reshape(-1, 2)
+            coords[:, 0] = (coords[:, 0] - w) / dx * model_w
+            coords[:, 1] = (coords[:, 1] - s) / dy * model_h
+            line = coords.tolist()
+            tags = el.get("tags", {})
+            if tags.get("natural") == "water" or "waterway" in tags:
+                layers["water"].append(line)
+            elif tags.get("landuse") in {"forest", "meadow", "grass"} or tags.get("leisure") in {"park", "garden"}:
+                layers["green"].append(line)
+            elif tags.get("highway") in {"motorway", "trunk", "primary"}:
+                layers["detail"].append(line)
+    except Exception:
+        return {"water": [], "green": [], "detail": []}
     return layers
 
 
+# STL parts written by the Blender script: job key part -> file name after "{stem}_[test_]".
+_BLENDER_OUTPUT_NAMES = {
+    "map": "map.stl",
+    "frame": "frame.stl",
+    "base": "base_brown.stl",
+    "water": "water.stl",
+    "green": "green.stl",
+    "detail": "detail.stl",
+    "track_inlay": "track_inlay_red.stl",
+}
+
+
 def _prepare_job_assets(
     gpx_path: str | Path,
     dem_path: str | Path,
     out_stl_path: str | Path,
     params: GenerateConfig,
 ) -> tuple[Path, Path]:
+    points_lonlat = load_gpx_points(gpx_path)
+
+    # DEM read and Overpass download are independent: run the download alongside the DEM work.
+    osm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="maps3d-osm")
+    osm_future = osm_executor.submit(_fetch_osm_layers, points_lonlat, params.model_width_mm, params.model_height_mm)
+    osm_executor.shutdown(wait=False)
+
     normalized01, track_xy_mm, z_min_mm, z_max_mm, z_range_mm, _, _, _, _ = _compute_dem_metrics(
-        gpx_path, dem_path, params
+        points_lonlat, dem_path, params
     )
-    points_lonlat = load_gpx_points(gpx_path)
-    osm_layers = _fetch_osm_layers(points_lonlat, params.model_width_mm, params.model_height_mm)
+
+    # Same value estimate_relief_mm() would return, without re-reading the DEM.
+    model_relief_mm = float(z_range_mm * params.vertical_scale)
+    max_model_span_mm = max(float(params.model_width_mm), float(params.model_height_mm), 1.0)
+    if model_relief_mm > max_model_span_mm * 5.0:
+        raise ValueError(
+            "Rilievo DEM fuori scala per il modello: "
+            f"relief={model_relief_mm:.2f} mm, "
+            f"size={params.model_width_mm:.2f}x{params.model_height_mm:.2f} mm. "
+            "Controlla CRS/unità del DEM o riduci la scala verticale."
+        )
+
+    osm_layers = osm_future.result()
 
     job_dir = Path(tempfile.mkdtemp(prefix="maps3d_job_"))
-    heightmap_path = job_dir / "heightmap.tif"
+    heightmap_path = job_dir / "heightmap.npy"
     job_json_path = job_dir / "job.json"
 
-    base_out = Path(out_stl_path)
-    suffix = "test_" if params.test_mode else ""
-    out_map_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}map.stl").resolve())
-    out_frame_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}frame.stl").resolve())
-    out_base_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}base_brown.stl").resolve())
-    out_water_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}water.stl").resolve())
-    out_green_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}green.stl").resolve())
-    out_detail_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}detail.stl").resolve())
-    out_track_inlay_stl_path = str(base_out.with_name(f"{base_out.stem}_{suffix}track_inlay_red.stl").resolve())
-
-    heightmap_u16 = np.round(normalized01 * 65535.0).astype(np.uint16)
-    with rasterio.open(
-        heightmap_path,
-        "w",
-        driver="GTiff",
-        height=heightmap_u16.shape[0],
-        width=heightmap_u16.shape[1],
-        count=1,
-        dtype="uint16",
-    ) as out_ds:
-        out_ds.write(heightmap_u16, 1)
+    out_paths = _blender_output_paths(out_stl_path, params.test_mode)
+
+    # Scale/round in place: normalized01 is not used afterwards, so skip the float temporaries.
+    np.multiply(normalized01, 65535.0, out=normalized01)
+    np.rint(normalized01, out=normalized01)
+    heightmap_u16 = normalized01.astype(np.uint16)
+    del normalized01
+    # Raw .npy handoff: Blender only needs the grid values, no GeoTIFF encode/decode.
+    np.save(heightmap_path, heightmap_u16)
 
     job: dict[str, Any] = {
         "size_mm_x": params.model_width_mm,
@@ -271,14 +293,10 @@ def _prepare_job_assets(
         "grid_res": int(params.grid_res),
         "track_points_mm": track_xy_mm.tolist(),
         "heightmap_path": str(heightmap_path),
+        "heightmap_dtype": str(heightmap_u16.dtype),
+        "heightmap_shape": list(heightmap_u16.shape),
         "out_stl_path": str(Path(out_stl_path).resolve()),
-        "out_map_stl_path": out_map_stl_path,
-        "out_frame_stl_path": out_frame_stl_path,
-        "out_base_stl_path": out_base_stl_path,
-        "out_water_stl_path": out_water_stl_path,
-        "out_green_stl_path": out_green_stl_path,
-        "out_detail_stl_path": out_detail_stl_path,
-        "out_track_inlay_stl_path": out_track_inlay_stl_path,
+        **{f"out_{part}_stl_path": str(path) for part, path in out_paths.items()},
         "separate_frame": bool(params.separate_frame),
         "frame_wall_mm": float(params.frame_wall_mm),
         "frame_height_mm": float(params.frame_height_mm),
@@ -318,6 +336,237 @@ def _prepare_job_assets(
     return job_dir, job_json_path
 
 
+def _blender_output_paths(out_stl_path: str | Path, test_mode: bool) -> dict[str, Path]:
+    """Absolute paths of the STLs the Blender script writes, by part (output folder resolved once)."""
+    base_out = Path(out_stl_path)
+    out_dir = base_out.parent.resolve()
+    prefix = f"{base_out.stem}_test_" if test_mode else f"{base_out.stem}_"
+    return {part: out_dir / f"{prefix}{name}" for part, name in _BLENDER_OUTPUT_NAMES.items()}
+
+
+def _missing_blender_outputs(out_stl_path: str | Path, params: GenerateConfig) -> list[Path]:
+    paths = _blender_output_paths(out_stl_path, params.test_mode)
+    expected = [paths[part] for part in ("base", "water", "green", "detail", "track_inlay")]
+    if params.separate_frame:
+        expected.append(paths["frame"])
+
+    return [p for p in expected if (not p.exists()) or p.stat().st_size == 0]
+
+
+def _run_blender_script_inprocess(job_json: Path) -> None:
+    """Run the Blender script with the pip-installed ``bpy`` module, skipping Blender startup."""
+    import bpy
+
+    from ..engine import blender_script
+
+    # Same clean state the subprocess gets from --factory-startup.
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    try:
+        blender_script.main(job_json)
+    except Exception as exc:
+        raise RuntimeError(f"Blender pipeline (bpy in-process) fallita.\nJob JSON: {job_json}\n{exc}") from exc
+
+
+# Must match blender_script._WORKER_DONE_TAG.
+_WORKER_DONE_TAG = "[maps3d][worker] done"
+
+
+class BlenderWorker:
+    """A background Blender process running blender_script.py in worker mode.
+
+    Jobs are sent as job.json paths on stdin; the script answers with a done line
+    per job, so Blender starts (and loads its add-ons) only once per session.
+    """
+
+    def __init__(self, blender_exe: str, blender_script: Path):
+        self.blender_exe = str(blender_exe)
+        self.blender_script = Path(blender_script)
+        self.command = [
+            self.blender_exe,
+            "--background",
+            "--factory-startup",
+            "--python-exit-code", "1",
+            "--python", str(self.blender_script),
+            "--", "--worker",
+        ]
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    @property
+    def returncode(self) -> int | None:
+        return self._proc.poll()
+
+    def run_job(self, job_json: Path, keep_lines: int = 400) -> tuple[bool, str]:
+        """Run one job and wait for it; return (ok, last output lines)."""
+        assert self._proc.stdin is not None and self._proc.stdout is not None
+        tail: deque[str] = deque(maxlen=keep_lines)
+        try:
+            self._proc.stdin.write(f"{job_json}\n")
+            self._proc.stdin.flush()
+        except OSError as exc:
+            return False, f"Worker Blender non raggiungibile: {exc}"
+
+        for line in self._proc.stdout:
+            line = line.rstrip("\n")
+            if line.startswith(_WORKER_DONE_TAG):
+                return line.endswith(" ok"), "\n".join(tail)
+            tail.append(line)
+        # EOF before the done line: Blender exited (crash or killed).
+        self._proc.wait()
+        return False, "\n".join(tail)
+
+    def close(self, timeout_s: float = 10.0) -> None:
+        if self.alive:
+            try:
+                assert self._proc.stdin is not None
+                self._proc.stdin.write("QUIT\n")
+                self._proc.stdin.close()
+                self._proc.wait(timeout=timeout_s)
+            except (OSError, subprocess.TimeoutExpired):
+                self._proc.kill()
+                self._proc.wait()
+
+
+_worker: BlenderWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def _get_blender_worker(blender_exe: str, blender_script: Path) -> BlenderWorker:
+    """Return the shared worker, (re)starting it if it died or the exe/script changed."""
+    global _worker
+    w = _worker
+    if w is not None and w.alive and w.blender_exe == str(blender_exe) and w.blender_script == Path(blender_script):
+        return w
+    if w is not None:
+        w.close()
+    _worker = BlenderWorker(blender_exe, blender_script)
+    return _worker
+
+
+@atexit.register
+def _shutdown_blender_worker() -> None:
+    global _worker
+    if _worker is not None:
+        _worker.close()
+        _worker = None
+
+
+def _run_blender_streaming(cmd: list[str], keep_lines: int = 400) -> tuple[int, str, str]:
+    """Run Blender draining stdout/stderr as they arrive; return (returncode, stdout tail, stderr tail).
+
+    Only the last ``keep_lines`` lines of each stream are kept, so a chatty run can't
+    grow memory or stall on a full pipe. Stage lines from the script are echoed live.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        bufsize=1,
+    )
+    assert proc.stdout is not None and proc.stderr is not None
+    stdout_lines: deque[str] = deque(maxlen=keep_lines)
+    stderr_lines: deque[str] = deque(maxlen=keep_lines)
+    stderr_thread = threading.Thread(
+        target=lambda: stderr_lines.extend(line.rstrip("\n") for line in proc.stderr),
+        name="maps3d-blender-stderr",
+        daemon=True,
+    )
+    stderr_thread.start()
+    for line in proc.stdout:
+        line = line.rstrip("\n")
+        stdout_lines.append(line)
+        if line.startswith("[maps3d][stage]"):
+            print(f"[blender] {line}")
+    returncode = proc.wait()
+    stderr_thread.join()
+    return returncode, "\n".join(stdout_lines), "\n".join(stderr_lines)
+
+
+def _run_blender_worker_job(
+    blender_exe: str,
+    blender_script: Path,
+    blender_script_info: dict[str, Any],
+    job_dir: Path,
+    job_json: Path,
+    job_log_file: Path,
+    output_log_file: Path,
+    out_stl_path: str | Path,
+    params: GenerateConfig,
+) -> None:
+    """Run a prepared job on the persistent Blender worker, with the same logs/errors as a one-shot run."""
+    with _worker_lock:
+        worker = _get_blender_worker(blender_exe, blender_script)
+        command_str = " ".join(worker.command)
+        _append_run_log(
+            output_log_file,
+            "\n".join([
+                "=== Blender run (worker) ===",
+                f"command: {command_str}",
+                f"blender_script: {blender_script}",
+                f"blender_script_info: {blender_script_info}",
+                f"job_json: {job_json}",
+                f"job_log: {job_log_file}",
+            ]),
+        )
+        ok, output = worker.run_job(job_json)
+        returncode = worker.returncode
+
+    # The worker has no per-job --log-file: keep the job output next to job.json instead.
+    _append_run_log(job_log_file, output or "<vuoto>")
+    output_tail = _tail_text(output)
+    _append_run_log(
+        output_log_file,
+        "\n".join([
+            f"ok: {ok} (worker returncode: {returncode})",
+            "--- OUTPUT (tail) ---",
+            output_tail,
+            f"job_log_file: {job_log_file}",
+            "=== End Blender run ===",
+        ]),
+    )
+
+    if not ok:
+        raise RuntimeError(
+            "Blender pipeline fallita (worker persistente).\n"
+            f"Comando: {command_str}\n"
+            f"Script Blender: {blender_script}\n"
+            f"Job JSON: {job_json}\n"
+            f"Return code worker: {returncode}\n"
+            f"OUTPUT (ultime righe):\n{output_tail}\n"
+            f"Log salvato: {output_log_file}\n"
+            f"Log job: {job_log_file}"
+        )
+
+    missing = _missing_blender_outputs(out_stl_path, params)
+    if missing:
+        raise RuntimeError(
+            "Blender (worker persistente) ha terminato il job ma NON ha generato gli STL attesi.\n"
+            "File mancanti/vuoti:\n"
+            + "\n".join(f"- {p}" for p in missing)
+            + "\n\nComando: " + command_str
+            + "\nJob JSON: " + str(job_json)
+            + "\n\nOUTPUT (ultime righe):\n"
+            + output_tail
+            + f"\n\nJob dir: {job_dir}"
+            + f"\nLog salvato: {output_log_file}"
+        )
+
+
 def run_blender_pipeline(
     gpx_path: str | Path,
     dem_path: str | Path,
@@ -325,24 +574,29 @@ def run_blender_pipeline(
     params: GenerateConfig,
     blender_exe_path: str | None = None,
 ) -> None:
-    blender_exe = blender_exe_path or _autodetect_blender_exe()
-    if not blender_exe:
+    inprocess = bool(params.use_inprocess_bpy) and importlib.util.find_spec("bpy") is not None
+    blender_exe = None if inprocess else (blender_exe_path or _autodetect_blender_exe())
+    if not inprocess and not blender_exe:
         raise ValueError("Blender non trovato. Specifica il percorso di blender.exe nella UI.")
 
-    blender_script = _resolve_blender_script_path()
-    blender_script_info = _inspect_blender_script(blender_script)
-
     job_dir, job_json = _prepare_job_assets(gpx_path, dem_path, out_stl_path, params)
 
-    model_relief_mm = estimate_relief_mm(gpx_path, dem_path, params)
-    max_model_span_mm = max(float(params.model_width_mm), float(params.model_height_mm), 1.0)
-    if model_relief_mm > max_model_span_mm * 5.0:
-        raise ValueError(
-            "Rilievo DEM fuori scala per il modello: "
-            f"relief={model_relief_mm:.2f} mm, "
-            f"size={params.model_width_mm:.2f}x{params.model_height_mm:.2f} mm. "
-            "Controlla CRS/unità del DEM o riduci la scala verticale."
-        )
+    if inprocess:
+        print(f"[blender] Job json: {job_json} (bpy in-process)")
+        _run_blender_script_inprocess(job_json)
+        missing = _missing_blender_outputs(out_stl_path, params)
+        if missing:
+            raise RuntimeError(
+                "Blender (bpy in-process) ha terminato senza errori ma NON ha generato gli STL attesi.\n"
+                "File mancanti/vuoti:\n"
+                + "\n".join(f"- {p}" for p in missing)
+                + f"\n\nJob JSON: {job_json}"
+                + f"\nJob dir: {job_dir}"
+            )
+        return
+
+    blender_script = _resolve_blender_script_path()
+    blender_script_info = _inspect_blender_script(blender_script)
 
     job_log_file = Path(job_dir) / "blender_run.log"
     output_log_file = Path(out_stl_path).resolve().parent / "blender_run.log"
@@ -358,6 +612,13 @@ def run_blender_pipeline(
     if not job_json.exists():
         raise RuntimeError(f"Job JSON non creato: {job_json}")
 
+    if params.reuse_blender_process:
+        _run_blender_worker_job(
+            blender_exe, blender_script, blender_script_info, job_dir, job_json, job_log_file, output_log_file,
+            out_stl_path, params,
+        )
+        return
+
     cmd = [
         str(blender_exe),
         "--background",
@@ -382,14 +643,14 @@ def run_blender_pipeline(
         ]),
     )
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    returncode, stdout_text, stderr_text = _run_blender_streaming(cmd)
 
-    stdout_tail = _tail_text(result.stdout)
-    stderr_tail = _tail_text(result.stderr)
+    stdout_tail = _tail_text(stdout_text)
+    stderr_tail = _tail_text(stderr_text)
     _append_run_log(
         output_log_file,
         "\n".join([
-            f"returncode: {result.returncode}",
+            f"returncode: {returncode}",
             "--- STDOUT (tail) ---",
             stdout_tail,
             "--- STDERR (tail) ---",
@@ -399,33 +660,20 @@ def run_blender_pipeline(
         ]),
     )
 
-    if result.returncode != 0:
+    if returncode != 0:
         raise RuntimeError(
             "Blender pipeline fallita.\n"
             f"Comando: {command_str}\n"
             f"Script Blender: {blender_script}\n"
             f"Job JSON: {job_json}\n"
-            f"Return code: {result.returncode}\n"
+            f"Return code: {returncode}\n"
             f"STDOUT (ultime righe):\n{stdout_tail}\n"
             f"STDERR (ultime righe):\n{stderr_tail}\n"
             f"Log salvato: {output_log_file}\n"
             f"Log Blender (--log-file): {job_log_file}"
         )
 
-    # verifica output STL
-    base_out = Path(out_stl_path).resolve()
-    suffix = "test_" if params.test_mode else ""
-    expected = [
-        base_out.with_name(f"{base_out.stem}_{suffix}base_brown.stl"),
-        base_out.with_name(f"{base_out.stem}_{suffix}water.stl"),
-        base_out.with_name(f"{base_out.stem}_{suffix}green.stl"),
-        base_out.with_name(f"{base_out.stem}_{suffix}detail.stl"),
-        base_out.with_name(f"{base_out.stem}_{suffix}track_inlay_red.stl"),
-    ]
-    if params.separate_frame:
-        expected.append(base_out.with_name(f"{base_out.stem}_{suffix}frame.stl"))
-
-    missing = [p for p in expected if (not p.exists()) or p.stat().st_size == 0]
+    missing = _missing_blender_outputs(out_stl_path, params)
     if missing:
         raise RuntimeError(
             "Blender ha terminato senza errori ma NON ha generato gli STL attesi.\n"
@@ -434,7 +682,7 @@ def run_blender_pipeline(
             + "\n\nComando: " + command_str
             + "\nScript Blender: " + str(blender_script)
             + "\nJob JSON: " + str(job_json)
-            + "\nReturn code: " + str(result.returncode)
+            + "\nReturn code: " + str(returncode)
             + "\n\nSTDOUT (ultime righe):\n"
             + stdout_tail
             + "\n\nSTDERR (ultime righe):\n"
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import math
 import os
 import time
 import urllib.parse
@@ -9,17 +8,25 @@ import urllib.request
 from pathlib import Path
 from typing import Callable, Optional
 
+import numpy as np
+from numpy.typing import ArrayLike
+
 LogFn = Optional[Callable[[str], None]]
 
+# Ogni quanti byte scaricati loggare l'avanzamento.
+_MB = 1024 * 1024
+_PROGRESS_STEP_BYTES = 5 * _MB
+
 
-def _haversine_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+def _haversine_km(lon1: ArrayLike, lat1: ArrayLike, lon2: ArrayLike, lat2: ArrayLike) -> np.ndarray:
+    """Great-circle distance in km; accepts scalars or arrays (broadcast)."""
     r = 6371.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dp = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
-    return 2 * r * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    p1 = np.radians(lat1)
+    p2 = np.radians(lat2)
+    dp = np.radians(np.subtract(lat2, lat1))
+    dl = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * r * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
 
 def _validate_area(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> None:
@@ -29,13 +36,24 @@ def _validate_area(min_lon: float, min_lat: float, max_lon: float, max_lat: floa
     if lon_span > 2.0 or lat_span > 2.0:
         raise ValueError("Area troppo estesa (>2°). Riduci GPX o usa DEM manuale.")
 
-    w_km = _haversine_km(min_lon, min_lat, max_lon, min_lat)
-    h_km = _haversine_km(min_lon, min_lat, min_lon, max_lat)
+    w_km, h_km = _haversine_km(min_lon, min_lat, [max_lon, min_lon], [min_lat, max_lat])
     if max(w_km, h_km) > 300.0:
         raise ValueError(f"Area troppo estesa ({w_km:.1f}x{h_km:.1f} km). Limite 300 km.")
 
 
-def _download_url_to_file(url: str, out_path: Path, timeout_s: int, log: LogFn = None) -> None:
+def _download_url_to_file(
+    url: str,
+    out_path: Path,
+    timeout_s: int,
+    log: LogFn = None,
+    hard_timeout_s: float | None = None,
+) -> None:
+    """Stream ``url`` to ``out_path``.
+
+    ``timeout_s`` is the idle timeout (no bytes received); ``hard_timeout_s``, if set,
+    caps the whole download.
+    """
+    started = time.monotonic()
     req = urllib.request.Request(url, headers={"User-Agent": "Maps3DGen"})
     if log:
         log(f"OpenTopo: GET {url[:120]}...")
@@ -57,6 +75,9 @@ def _download_url_to_file(url: str, out_path: Path, timeout_s: int, log: LogFn =
             raise RuntimeError(f"OpenTopo error: {msg}")
 
         # Altrimenti scriviamo a chunk su file
+        total = int(resp.headers.get("Content-Length") or 0)
+        received = len(head)
+        next_report = _PROGRESS_STEP_BYTES
         with out_path.open("wb") as f:
             f.write(head)
             while True:
@@ -64,6 +85,13 @@ def _download_url_to_file(url: str, out_path: Path, timeout_s: int, log: LogFn =
                 if not chunk:
                     break
                 f.write(chunk)
+                received += len(chunk)
+                if log and received >= next_report:
+                    next_report += _PROGRESS_STEP_BYTES
+                    of_total = f" / {total / _MB:.1f}" if total else ""
+                    log(f"OpenTopo: ricevuti {received / _MB:.1f}{of_total} MB")
+                if hard_timeout_s is not None and time.monotonic() - started > hard_timeout_s:
+                    raise TimeoutError(f"OpenTopo: download oltre {hard_timeout_s:.0f}s, interrotto.")
 
 
 def download_srtm_dem_for_bbox(
@@ -77,6 +105,7 @@ def download_srtm_dem_for_bbox(
     log: LogFn = None,
     api_key: str | None = None,
     demtype: str = "SRTMGL1",
+    hard_timeout_s: float | None = None,
 ) -> Path:
     """
     Download DEM (GeoTIFF) da OpenTopography Global DEM API.
@@ -88,6 +117,12 @@ def download_srtm_dem_for_bbox(
       - COP90 (Copernicus 90m)
 
     Serve API key: la passi con api_key=... oppure via env OPENTOPO_API_KEY.
+
+    L'API restituisce un unico GeoTIFF già mosaicato per tutta la bbox (una sola
+    richiesta, nessun tile da scaricare separatamente); l'avanzamento va su ``log``.
+
+    timeout_s è il timeout di inattività; hard_timeout_s (opzionale) limita la durata
+    totale di ogni tentativo.
     """
     _validate_area(min_lon, min_lat, max_lon, max_lat)
 
@@ -134,7 +169,7 @@ def download_srtm_dem_for_bbox(
             except Exception:
                 pass
 
-            _download_url_to_file(url, tmp, timeout_s=timeout_s, log=log)
+            _download_url_to_file(url, tmp, timeout_s=timeout_s, log=log, hard_timeout_s=hard_timeout_s)
 
             if not tmp.exists() or tmp.stat().st_size == 0:
                 raise RuntimeError("OpenTopo: file scaricato vuoto.")
@@ -148,7 +183,12 @@ def download_srtm_dem_for_bbox(
             last_err = str(exc)
             if log:
                 log(f"OpenTopo: fallito tentativo {attempt+1}: {last_err}")
-            time.sleep(1.0)
+            try:
+                tmp.unlink(missing_ok=True)
+            except Exception:
+                pass
+            if attempt < retries:
+                time.sleep(1.0)
 
     raise RuntimeError(
         "Download DEM fallito (OpenTopography).\n"
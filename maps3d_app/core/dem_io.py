@@ -0,0 +1,123 @@
+"""Shared DEM dataset handles.
+
+Generating a map opens the same DEM several times (relief estimate, job prep,
+pipeline). ``open_dem`` keeps a few datasets open and hands them out again.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import math
+from pathlib import Path
+import threading
+from typing import Iterator
+
+import numpy as np
+import rasterio
+
+logger = logging.getLogger(__name__)
+
+_MAX_OPEN_DEMS = 4
+# GDAL block cache (MB) for window reads: a window spanning many blocks of a big DEM
+# shouldn't evict its own blocks halfway through the read.
+_GDAL_CACHEMAX_MB = 512
+
+_lock = threading.RLock()
+_open_dems: OrderedDict[str, tuple[int, int, rasterio.io.DatasetReader]] = OrderedDict()
+
+
+@contextmanager
+def open_dem(dem_path: str | Path) -> Iterator[rasterio.io.DatasetReader]:
+    """Context manager yielding a cached, read-only DEM dataset.
+
+    The dataset stays open after the block; it is reopened when the file changes
+    (mtime/size) and closed when evicted. Use of a handle is serialized across threads.
+    """
+    path = Path(dem_path).resolve()
+    stat = path.stat()
+    key = str(path)
+    with _lock:
+        cached = _open_dems.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size) and not cached[2].closed:
+            _open_dems.move_to_end(key)
+            ds = cached[2]
+        else:
+            if cached is not None:
+                cached[2].close()
+            ds = rasterio.open(path)
+            _warn_if_striped(ds)
+            _open_dems[key] = (stat.st_mtime_ns, stat.st_size, ds)
+            while len(_open_dems) > _MAX_OPEN_DEMS:
+                _, (_, _, old_ds) = _open_dems.popitem(last=False)
+                old_ds.close()
+        yield ds
+
+
+def close_all() -> None:
+    """Close every cached dataset, releasing the files (Windows keeps open files locked)."""
+    with _lock:
+        for _, _, ds in _open_dems.values():
+            ds.close()
+        _open_dems.clear()
+
+
+def _warn_if_striped(ds: rasterio.io.DatasetReader) -> None:
+    block_rows, block_cols = ds.block_shapes[0]
+    if block_cols == ds.width and block_rows < 16 and ds.width > 4096:
+        logger.warning(
+            "DEM %s is striped (%dx%d blocks): window reads are slow; "
+            "consider a tiled GeoTIFF with overviews (gdal_translate -co TILED=YES).",
+            ds.name,
+            block_rows,
+            block_cols,
+        )
+
+
+def bbox_window(transform: rasterio.Affine, minx: float, miny: float, maxx: float, maxy: float) -> rasterio.windows.Window:
+    """Whole-pixel window covering a bbox in the dataset CRS.
+
+    Same result as ``from_bounds(...).round_offsets().round_lengths()``, computed directly
+    from the inverse transform without the intermediate fractional windows.
+    """
+    inv = ~transform
+    cols, rows = zip(*(inv * xy for xy in ((minx, maxy), (maxx, maxy), (maxx, miny), (minx, miny))))
+    col_start, row_start = min(cols), min(rows)
+    return rasterio.windows.Window(
+        math.floor(col_start + 0.1),
+        math.floor(row_start + 0.1),
+        math.floor(max(max(cols) - col_start, 0.0) + 0.5),
+        math.floor(max(max(rows) - row_start, 0.0) + 0.5),
+    )
+
+
+def clipped_bbox_window(
+    ds: rasterio.io.DatasetReader, minx: float, miny: float, maxx: float, maxy: float
+) -> rasterio.windows.Window:
+    """``bbox_window`` clipped to the raster: the window a non-boundless read actually returns.
+
+    Relief scale, model grid and buffer shapes all derive from this one window.
+    Raises ValueError when the bbox does not overlap the raster.
+    """
+    window = bbox_window(ds.transform, minx, miny, maxx, maxy)
+    try:
+        window = window.intersection(rasterio.windows.Window(0, 0, ds.width, ds.height))
+    except rasterio.errors.WindowError:
+        raise ValueError("Ritaglio DEM vuoto: controlla GPX e DEM.") from None
+    if int(window.height) <= 0 or int(window.width) <= 0:
+        raise ValueError("Ritaglio DEM vuoto: controlla GPX e DEM.")
+    return window
+
+
+def read_dem_window(
+    ds: rasterio.io.DatasetReader,
+    window: rasterio.windows.Window,
+    masked: bool = False,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Read band 1 of ``window`` as float32 (into ``out`` if given) with a sized GDAL cache."""
+    with rasterio.Env(GDAL_CACHEMAX=_GDAL_CACHEMAX_MB):
+        if out is not None:
+            return ds.read(1, window=window, masked=masked, out=out)
+        return ds.read(1, window=window, masked=masked, out_dtype="float32", boundless=False)
@@ -27,9 +27,8 @@ class SrtmProvider(DemProvider):
     name = "srtm"
 
     def get_dem(self, bbox: BBox, out_path: Path, log: LogFn = None) -> Path:
-        # Se la tua funzione NON supporta log=..., rimuovi log=log
         dem_path = download_srtm_dem_for_bbox(
-            (bbox.min_lon, bbox.min_lat, bbox.max_lon, bbox.max_lat),
+            bbox.min_lon, bbox.min_lat, bbox.max_lon, bbox.max_lat,
             str(out_path),
             log=log,
         )
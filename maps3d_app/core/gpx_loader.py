@@ -1,25 +1,43 @@
 from __future__ import annotations
 
+from array import array
+from functools import lru_cache
 from pathlib import Path
 import xml.etree.ElementTree as ET
 
 import numpy as np
 
 
-def load_gpx_points(gpx_path: str | Path) -> np.ndarray:
-    """Return GPX track points as Nx2 array [lon, lat]."""
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
-
-    points: list[tuple[float, float]] = []
-    for trkpt in root.findall(".//{*}trkpt"):
-        lat = trkpt.attrib.get("lat")
-        lon = trkpt.attrib.get("lon")
-        if lat is None or lon is None:
+@lru_cache(maxsize=8)
+def _load_gpx_points_cached(path: str, mtime_ns: int, size: int) -> np.ndarray:
+    lons = array("d")
+    lats = array("d")
+    for _, elem in ET.iterparse(path, events=("end",)):
+        tag = elem.tag
+        if tag != "trkpt" and not tag.endswith("}trkpt"):
             continue
-        points.append((float(lon), float(lat)))
+        lat = elem.attrib.get("lat")
+        lon = elem.attrib.get("lon")
+        if lat is not None and lon is not None:
+            lons.append(float(lon))
+            lats.append(float(lat))
+        elem.clear()
 
-    if len(points) < 2:
+    if len(lons) < 2:
         raise ValueError("Il file GPX deve contenere almeno 2 punti traccia.")
 
-    return np.asarray(points, dtype=np.float64)
+    points = np.column_stack((np.frombuffer(lons, dtype=np.float64), np.frombuffer(lats, dtype=np.float64)))
+    # Shared between callers through the cache: keep it read-only.
+    points.flags.writeable = False
+    return points
+
+
+def load_gpx_points(gpx_path: str | Path) -> np.ndarray:
+    """Return GPX track points as Nx2 array [lon, lat].
+
+    Results are cached per (path, mtime, size), so repeated calls within a run
+    don't re-parse the file. The returned array is read-only.
+    """
+    path = Path(gpx_path).resolve()
+    stat = path.stat()
+    return _load_gpx_points_cached(str(path), stat.st_mtime_ns, stat.st_size)
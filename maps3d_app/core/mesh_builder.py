@@ -1,11 +1,140 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 import numpy as np
 import trimesh
 
-
-def _grid_index(row: int, col: int, cols: int) -> int:
-    return row * cols + col
+try:
+    from numba import njit
+except ImportError:  # numba is optional: the vectorized NumPy builders are used instead
+    njit = None
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _fill_grid_faces(rows: int, cols: int, out_faces: np.ndarray) -> None:
+        quads = (rows - 1) * (cols - 1)
+        n = rows * cols
+        for r in range(rows - 1):
+            for c in range(cols - 1):
+                v00 = r * cols + c
+                v10 = v00 + cols
+                v01 = v00 + 1
+                v11 = v00 + cols + 1
+                k = 2 * (r * (cols - 1) + c)
+                out_faces[k, 0], out_faces[k, 1], out_faces[k, 2] = v00, v10, v01
+                out_faces[k + 1, 0], out_faces[k + 1, 1], out_faces[k + 1, 2] = v01, v10, v11
+                kb = k + 2 * quads
+                out_faces[kb, 0], out_faces[kb, 1], out_faces[kb, 2] = v00 + n, v01 + n, v10 + n
+                out_faces[kb + 1, 0], out_faces[kb + 1, 1], out_faces[kb + 1, 2] = v01 + n, v11 + n, v10 + n
+
+    @njit(cache=True)
+    def _fill_wall_faces(rows: int, cols: int, out_faces: np.ndarray) -> None:
+        n = rows * cols
+        k = 0
+        for edge in range(4):
+            count = cols - 1 if edge < 2 else rows - 1
+            for i in range(count):
+                if edge == 0:
+                    a, b = i, i + 1
+                elif edge == 1:
+                    a, b = (rows - 1) * cols + i + 1, (rows - 1) * cols + i
+                elif edge == 2:
+                    a, b = (i + 1) * cols, i * cols
+                else:
+                    a, b = i * cols + cols - 1, (i + 1) * cols + cols - 1
+                out_faces[k, 0], out_faces[k, 1], out_faces[k, 2] = a, b, a + n
+                out_faces[k + 1, 0], out_faces[k + 1, 1], out_faces[k + 1, 2] = b, b + n, a + n
+                k += 2
+
+    @njit(cache=True, fastmath=True)
+    def _build_prisms(
+        p0: np.ndarray,
+        p1: np.ndarray,
+        z0: np.ndarray,
+        z1: np.ndarray,
+        half_width: float,
+        height: float,
+        local_faces: np.ndarray,
+        verts_out: np.ndarray,
+        faces_out: np.ndarray,
+    ) -> None:
+        for i in range(p0.shape[0]):
+            dx = p1[i, 0] - p0[i, 0]
+            dy = p1[i, 1] - p0[i, 1]
+            length = np.sqrt(dx * dx + dy * dy)
+            ox = -dy / length * half_width
+            oy = dx / length * half_width
+            v = 8 * i
+            for side in range(2):
+                px = p0[i, 0] if side == 0 else p1[i, 0]
+                py = p0[i, 1] if side == 0 else p1[i, 1]
+                pz = z0[i] if side == 0 else z1[i]
+                j = v + 2 * side
+                verts_out[j, 0], verts_out[j, 1], verts_out[j, 2] = px - ox, py - oy, pz
+                verts_out[j + 1, 0], verts_out[j + 1, 1], verts_out[j + 1, 2] = px + ox, py + oy, pz
+                verts_out[j + 4, 0], verts_out[j + 4, 1], verts_out[j + 4, 2] = px - ox, py - oy, pz + height
+                verts_out[j + 5, 0], verts_out[j + 5, 1], verts_out[j + 5, 2] = px + ox, py + oy, pz + height
+            for f in range(local_faces.shape[0]):
+                for k in range(3):
+                    faces_out[12 * i + f, k] = v + local_faces[f, k]
+
+else:
+    _fill_grid_faces = None
+    _fill_wall_faces = None
+    _build_prisms = None
+
+
+def _grid_faces(rows: int, cols: int) -> np.ndarray:
+    r = np.arange(rows - 1, dtype=np.int64)[:, None]
+    c = np.arange(cols - 1, dtype=np.int64)[None, :]
+    v00 = r * cols + c
+    v10 = v00 + cols
+    v01 = v00 + 1
+    v11 = v00 + cols + 1
+
+    tri_a = np.stack((v00, v10, v01), axis=-1)
+    tri_b = np.stack((v01, v10, v11), axis=-1)
+    return np.stack((tri_a, tri_b), axis=2).reshape(-1, 3)
+
+
+def _wall_faces(rows: int, cols: int) -> np.ndarray:
+    n = rows * cols
+    c = np.arange(cols - 1, dtype=np.int64)
+    r = np.arange(rows - 1, dtype=np.int64)
+
+    # Perimeter edges (top_a -> top_b), wound so that the wall normals face outwards.
+    top_a = np.concatenate((c, (rows - 1) * cols + c + 1, (r + 1) * cols, r * cols + cols - 1))
+    top_b = np.concatenate((c + 1, (rows - 1) * cols + c, r * cols, (r + 1) * cols + cols - 1))
+    bot_a = top_a + n
+    bot_b = top_b + n
+
+    tri_a = np.stack((top_a, top_b, bot_a), axis=-1)
+    tri_b = np.stack((top_b, bot_b, bot_a), axis=-1)
+    return np.stack((tri_a, tri_b), axis=1).reshape(-1, 3)
+
+
+@lru_cache(maxsize=8)
+def _terrain_faces(rows: int, cols: int) -> np.ndarray:
+    """Faces of the closed terrain solid (top, bottom, walls) for a rows x cols grid.
+
+    The topology depends only on the grid shape, so it is built once per shape and
+    shared (read-only) by every mesh of that resolution.
+    """
+    if _fill_grid_faces is not None:
+        quads = (rows - 1) * (cols - 1)
+        faces = np.empty((4 * quads + 4 * (rows + cols - 2), 3), dtype=np.int64)
+        _fill_grid_faces(rows, cols, faces[: 4 * quads])
+        _fill_wall_faces(rows, cols, faces[4 * quads :])
+    else:
+        top_faces = _grid_faces(rows, cols)
+        # Bottom faces: same grid shifted to the lower vertex block, with reversed winding.
+        bottom_faces = top_faces[:, [0, 2, 1]] + rows * cols
+        faces = np.concatenate((top_faces, bottom_faces, _wall_faces(rows, cols)))
+    faces.flags.writeable = False
+    return faces
 
 
 def build_terrain_mesh(
@@ -15,64 +144,36 @@ def build_terrain_mesh(
     base_thickness_mm: float,
 ) -> trimesh.Trimesh:
     rows, cols = z_mm.shape
-    xx, yy = np.meshgrid(x_mm, y_mm)
-
-    top_vertices = np.column_stack((xx.ravel(), yy.ravel(), z_mm.ravel()))
-    bottom_vertices = np.column_stack((xx.ravel(), yy.ravel(), np.full(rows * cols, -base_thickness_mm)))
-    vertices = np.vstack((top_vertices, bottom_vertices))
-
-    faces: list[list[int]] = []
-
-    # Top + bottom
-    for r in range(rows - 1):
-        for c in range(cols - 1):
-            v00 = _grid_index(r, c, cols)
-            v10 = _grid_index(r + 1, c, cols)
-            v01 = _grid_index(r, c + 1, cols)
-            v11 = _grid_index(r + 1, c + 1, cols)
-
-            faces.append([v00, v10, v01])
-            faces.append([v01, v10, v11])
-
-            b00 = v00 + rows * cols
-            b10 = v10 + rows * cols
-            b01 = v01 + rows * cols
-            b11 = v11 + rows * cols
-            faces.append([b00, b01, b10])
-            faces.append([b01, b11, b10])
-
-    def add_wall(top_a: int, top_b: int) -> None:
-        bot_a = top_a + rows * cols
-        bot_b = top_b + rows * cols
-        faces.append([top_a, top_b, bot_a])
-        faces.append([top_b, bot_b, bot_a])
-
-    for c in range(cols - 1):
-        add_wall(_grid_index(0, c, cols), _grid_index(0, c + 1, cols))
-        add_wall(_grid_index(rows - 1, c + 1, cols), _grid_index(rows - 1, c, cols))
-
-    for r in range(rows - 1):
-        add_wall(_grid_index(r + 1, 0, cols), _grid_index(r, 0, cols))
-        add_wall(_grid_index(r, cols - 1, cols), _grid_index(r + 1, cols - 1, cols))
-
-    mesh = trimesh.Trimesh(vertices=vertices, faces=np.asarray(faces, dtype=np.int64), process=False)
+
+    # Filled in place (top block, then bottom block) and handed to trimesh as-is:
+    # float64, C-contiguous, so no intermediate grids and no copy on construction.
+    vertices = np.empty((2 * rows * cols, 3), dtype=np.float64)
+    grid = vertices.reshape(2, rows, cols, 3)
+    grid[:, :, :, 0] = x_mm[None, None, :]
+    grid[:, :, :, 1] = y_mm[None, :, None]
+    grid[0, :, :, 2] = z_mm
+    grid[1, :, :, 2] = -base_thickness_mm
+
+    mesh = trimesh.Trimesh(vertices=vertices, faces=_terrain_faces(rows, cols), process=False)
     return mesh
 
 
-def sample_height_on_grid(x_mm: np.ndarray, y_mm: np.ndarray, z_mm: np.ndarray, px: float, py: float) -> float:
-    x = np.clip(px, x_mm[0], x_mm[-1])
-    y = np.clip(py, y_mm[0], y_mm[-1])
+def sample_height_on_grid_batch(
+    x_mm: np.ndarray, y_mm: np.ndarray, z_mm: np.ndarray, px: np.ndarray, py: np.ndarray
+) -> np.ndarray:
+    x = np.clip(np.asarray(px, dtype=np.float64), x_mm[0], x_mm[-1])
+    y = np.clip(np.asarray(py, dtype=np.float64), y_mm[0], y_mm[-1])
 
-    ix = np.searchsorted(x_mm, x, side="right") - 1
-    iy = np.searchsorted(y_mm, y, side="right") - 1
-    ix = np.clip(ix, 0, len(x_mm) - 2)
-    iy = np.clip(iy, 0, len(y_mm) - 2)
+    ix = np.clip(np.searchsorted(x_mm, x, side="right") - 1, 0, len(x_mm) - 2)
+    iy = np.clip(np.searchsorted(y_mm, y, side="right") - 1, 0, len(y_mm) - 2)
 
     x0, x1 = x_mm[ix], x_mm[ix + 1]
     y0, y1 = y_mm[iy], y_mm[iy + 1]
 
-    tx = 0.0 if x1 == x0 else (x - x0) / (x1 - x0)
-    ty = 0.0 if y1 == y0 else (y - y0) / (y1 - y0)
+    dx = x1 - x0
+    dy = y1 - y0
+    tx = np.where(dx == 0, 0.0, (x - x0) / np.where(dx == 0, 1.0, dx))
+    ty = np.where(dy == 0, 0.0, (y - y0) / np.where(dy == 0, 1.0, dy))
 
     z00 = z_mm[iy, ix]
     z10 = z_mm[iy, ix + 1]
@@ -81,7 +182,90 @@ def sample_height_on_grid(x_mm: np.ndarray, y_mm: np.ndarray, z_mm: np.ndarray,
 
     z0 = z00 * (1 - tx) + z10 * tx
     z1 = z01 * (1 - tx) + z11 * tx
-    return float(z0 * (1 - ty) + z1 * ty)
+    return z0 * (1 - ty) + z1 * ty
+
+
+def sample_height_on_grid(x_mm: np.ndarray, y_mm: np.ndarray, z_mm: np.ndarray, px: float, py: float) -> float:
+    return float(sample_height_on_grid_batch(x_mm, y_mm, z_mm, np.array([px]), np.array([py]))[0])
+
+
+# Per-prism triangles over the 8 corners: base (l0, r0, l1, r1) then top (l0, r0, l1, r1).
+_PRISM_FACES = np.array(
+    [
+        [0, 2, 1], [1, 2, 3],
+        [4, 5, 6], [5, 7, 6],
+        [0, 1, 4], [1, 5, 4],
+        [2, 6, 3], [3, 6, 7],
+        [1, 3, 5], [3, 7, 5],
+        [0, 4, 2], [2, 4, 6],
+    ],
+    dtype=np.int64,
+)
+
+
+def _empty_arrays() -> tuple[np.ndarray, np.ndarray]:
+    return np.zeros((0, 3), dtype=np.float64), np.zeros((0, 3), dtype=np.int64)
+
+
+def _stack_arrays(parts: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenate disjoint (vertices, faces) parts, offsetting each part's face indices."""
+    parts = [(v, f) for v, f in parts if len(f)]
+    if not parts:
+        return _empty_arrays()
+    vertices = np.concatenate([v for v, _ in parts])
+    offsets = np.cumsum([0] + [len(v) for v, _ in parts[:-1]])
+    faces = np.concatenate([f + off for (_, f), off in zip(parts, offsets)])
+    return vertices, faces
+
+
+def _track_arrays(
+    track_xy_mm: np.ndarray,
+    x_mm: np.ndarray,
+    y_mm: np.ndarray,
+    z_mm: np.ndarray,
+    track_height_mm: float,
+    track_width_mm: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    track_xy_mm = np.asarray(track_xy_mm, dtype=np.float64)
+    if len(track_xy_mm) < 2:
+        return _empty_arrays()
+
+    p0 = track_xy_mm[:-1]
+    p1 = track_xy_mm[1:]
+    v = p1 - p0
+    length = np.linalg.norm(v, axis=1)
+    keep = length >= 1e-6
+    if not np.any(keep):
+        return _empty_arrays()
+
+    # Each track point is shared by two segments: sample the terrain once per point.
+    zs = sample_height_on_grid_batch(x_mm, y_mm, z_mm, track_xy_mm[:, 0], track_xy_mm[:, 1]) + 0.05
+    p0, p1 = p0[keep], p1[keep]
+    z0, z1 = zs[:-1][keep], zs[1:][keep]
+
+    n_seg = len(p0)
+    if _build_prisms is not None:
+        vertices = np.empty((n_seg * 8, 3), dtype=np.float64)
+        faces = np.empty((n_seg * 12, 3), dtype=np.int64)
+        _build_prisms(p0, p1, z0, z1, track_width_mm / 2.0, float(track_height_mm), _PRISM_FACES, vertices, faces)
+        return vertices, faces
+
+    direction = v[keep] / length[keep][:, None]
+    normal = np.column_stack((-direction[:, 1], direction[:, 0]))
+    offset = normal * (track_width_mm / 2.0)
+
+    prisms = np.empty((n_seg, 8, 3), dtype=np.float64)
+    prisms[:, 0, :2] = p0 - offset
+    prisms[:, 1, :2] = p0 + offset
+    prisms[:, 2, :2] = p1 - offset
+    prisms[:, 3, :2] = p1 + offset
+    prisms[:, 0:2, 2] = z0[:, None]
+    prisms[:, 2:4, 2] = z1[:, None]
+    prisms[:, 4:8] = prisms[:, 0:4]
+    prisms[:, 4:8, 2] += track_height_mm
+
+    faces = np.arange(n_seg, dtype=np.int64)[:, None, None] * 8 + _PRISM_FACES[None]
+    return prisms.reshape(-1, 3), faces.reshape(-1, 3)
 
 
 def build_track_mesh(
@@ -92,53 +276,8 @@ def build_track_mesh(
     track_height_mm: float,
     track_width_mm: float = 1.2,
 ) -> trimesh.Trimesh:
-    vertices: list[np.ndarray] = []
-    faces: list[list[int]] = []
-
-    for i in range(len(track_xy_mm) - 1):
-        p0 = track_xy_mm[i]
-        p1 = track_xy_mm[i + 1]
-        v = p1 - p0
-        length = np.linalg.norm(v)
-        if length < 1e-6:
-            continue
-
-        direction = v / length
-        normal = np.array([-direction[1], direction[0]])
-        offset = normal * (track_width_mm / 2.0)
-
-        z0 = sample_height_on_grid(x_mm, y_mm, z_mm, p0[0], p0[1]) + 0.05
-        z1 = sample_height_on_grid(x_mm, y_mm, z_mm, p1[0], p1[1]) + 0.05
-
-        base0_l = np.array([p0[0] - offset[0], p0[1] - offset[1], z0])
-        base0_r = np.array([p0[0] + offset[0], p0[1] + offset[1], z0])
-        base1_l = np.array([p1[0] - offset[0], p1[1] - offset[1], z1])
-        base1_r = np.array([p1[0] + offset[0], p1[1] + offset[1], z1])
-
-        top0_l = base0_l + np.array([0.0, 0.0, track_height_mm])
-        top0_r = base0_r + np.array([0.0, 0.0, track_height_mm])
-        top1_l = base1_l + np.array([0.0, 0.0, track_height_mm])
-        top1_r = base1_r + np.array([0.0, 0.0, track_height_mm])
-
-        prism = [base0_l, base0_r, base1_l, base1_r, top0_l, top0_r, top1_l, top1_r]
-        start = len(vertices)
-        vertices.extend(prism)
-
-        local_faces = [
-            [0, 2, 1], [1, 2, 3],
-            [4, 5, 6], [5, 7, 6],
-            [0, 1, 4], [1, 5, 4],
-            [2, 6, 3], [3, 6, 7],
-            [1, 3, 5], [3, 7, 5],
-            [0, 4, 2], [2, 4, 6],
-        ]
-        for face in local_faces:
-            faces.append([start + idx for idx in face])
-
-    if not vertices:
-        return trimesh.Trimesh(vertices=np.zeros((0, 3)), faces=np.zeros((0, 3), dtype=np.int64), process=False)
-
-    return trimesh.Trimesh(vertices=np.asarray(vertices), faces=np.asarray(faces, dtype=np.int64), process=False)
+    vertices, faces = _track_arrays(track_xy_mm, x_mm, y_mm, z_mm, track_height_mm, track_width_mm)
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
 
 
 def build_line_layer_mesh(
@@ -149,26 +288,15 @@ def build_line_layer_mesh(
     layer_height_mm: float,
     layer_width_mm: float,
 ) -> trimesh.Trimesh:
-    meshes: list[trimesh.Trimesh] = []
-    for segment in line_segments_xy_mm:
-        if len(segment) < 2:
-            continue
-        mesh = build_track_mesh(
-            track_xy_mm=segment,
-            x_mm=x_mm,
-            y_mm=y_mm,
-            z_mm=z_mm,
-            track_height_mm=layer_height_mm,
-            track_width_mm=layer_width_mm,
-        )
-        if mesh.faces.shape[0] > 0:
-            meshes.append(mesh)
-
-    if not meshes:
-        return trimesh.Trimesh(vertices=np.zeros((0, 3)), faces=np.zeros((0, 3), dtype=np.int64), process=False)
-
-    return trimesh.util.concatenate(meshes)
-
+    # Build plain (vertices, faces) arrays per polyline and stack them once, instead of
+    # one Trimesh per polyline merged by trimesh.util.concatenate.
+    parts = [
+        _track_arrays(segment, x_mm, y_mm, z_mm, layer_height_mm, layer_width_mm)
+        for segment in line_segments_xy_mm
+        if len(segment) >= 2
+    ]
+    vertices, faces = _stack_arrays(parts)
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
 
 
 def _box_mesh(min_x: float, max_x: float, min_y: float, max_y: float, min_z: float, max_z: float) -> trimesh.Trimesh:
@@ -38,9 +38,9 @@ class ModelSpace:
         )
 
     def to_model_xy(self, src_xy: np.ndarray) -> np.ndarray:
-        out = np.empty_like(src_xy, dtype=np.float64)
-        out[:, 0] = (src_xy[:, 0] - self.src_min_x) / self.src_span_x * self.model_width_mm
-        out[:, 1] = (src_xy[:, 1] - self.src_min_y) / self.src_span_y * self.model_height_mm
+        # One broadcast subtract + one in-place scale over both columns: no per-column temporaries.
+        out = np.subtract(src_xy, (self.src_min_x, self.src_min_y), dtype=np.float64)
+        out *= (self.model_width_mm / self.src_span_x, self.model_height_mm / self.src_span_y)
         return out
 
     def to_model_x(self, x: np.ndarray) -> np.ndarray:
@@ -0,0 +1,37 @@
+"""Streaming access to the Overpass API, shared by the Python and Blender backends."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from typing import Any, Iterator
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+try:
+    import ijson
+except ImportError:  # ijson is optional: fall back to parsing the whole payload
+    ijson = None
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+
+def iter_overpass_elements(query: str, timeout_s: float = 30.0) -> Iterator[dict[str, Any]]:
+    """Yield the ``elements`` of an Overpass JSON response one at a time.
+
+    With ijson installed the response is parsed incrementally, so memory stays flat
+    regardless of the payload size. Network and parse errors propagate to the caller.
+    """
+    req = Request(
+        OVERPASS_URL + "?" + urlencode({"data": query}),
+        headers={"User-Agent": "Maps3DGen", "Accept-Encoding": "gzip"},
+    )
+    with urlopen(req, timeout=timeout_s) as resp:
+        stream = resp
+        if (resp.headers.get("Content-Encoding") or "").lower() == "gzip":
+            stream = gzip.GzipFile(fileobj=resp)
+
+        if ijson is None:
+            yield from json.load(stream).get("elements", [])
+        else:
+            yield from ijson.items(stream, "elements.item", use_float=True)
@@ -1,23 +1,65 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-import json
+from functools import lru_cache
 from pathlib import Path
-from urllib.parse import urlencode
-from urllib.request import urlopen
+import threading
+from typing import Callable, Optional
 
 import numpy as np
 import rasterio
 from pyproj import Geod, Transformer
 import trimesh
+from trimesh.exchange.stl import export_stl
 from shapely.geometry import GeometryCollection, LineString, MultiLineString, box
 
+from .dem_io import clipped_bbox_window, open_dem, read_dem_window
 from .gpx_loader import load_gpx_points
-from .mesh_builder import build_line_layer_mesh, build_rect_frame_mesh, build_terrain_mesh
+from .mesh_builder import _stack_arrays, build_line_layer_mesh, build_rect_frame_mesh, build_terrain_mesh
 from .model_space import ModelSpace
+from .overpass import iter_overpass_elements
 
 _WGS84_GEOD = Geod(ellps="WGS84")
 
+ProgressFn = Optional[Callable[[int, str], None]]
+
+# pyproj Transformers are expensive to build and not thread-safe: cache them per thread.
+_TRANSFORMERS = threading.local()
+
+
+def _get_transformer(src_crs: object, dst_crs: object) -> Transformer:
+    key = tuple(crs if isinstance(crs, str) else crs.to_wkt() for crs in (src_crs, dst_crs))
+    cache: dict[tuple[str, ...], Transformer] | None = getattr(_TRANSFORMERS, "cache", None)
+    if cache is None:
+        cache = _TRANSFORMERS.cache = {}
+    transformer = cache.get(key)
+    if transformer is None:
+        transformer = cache[key] = Transformer.from_crs(key[0], key[1], always_xy=True)
+    return transformer
+
+
+def _is_wgs84(crs: object) -> bool:
+    return crs is not None and crs.to_epsg() == 4326
+
+
+def _transform_xy(transformer: Transformer, xy: np.ndarray) -> np.ndarray:
+    """Transform Nx2 points with a single pyproj call, writing into one new Fortran-ordered array.
+
+    Column-major storage makes both columns contiguous, so pyproj transforms them in place
+    (no separate output arrays, no column_stack).
+    """
+    out = np.array(xy, dtype=np.float64, order="F")
+    transformer.transform(out[:, 0], out[:, 1], inplace=True)
+    return out
+
+
+def _lonlat_to_dem_points(points_lonlat: np.ndarray, dem_crs: object) -> np.ndarray:
+    """Project Nx2 [lon, lat] points into the DEM CRS (no-op for WGS84 DEMs such as SRTM)."""
+    if _is_wgs84(dem_crs):
+        return points_lonlat
+    return _transform_xy(_get_transformer("EPSG:4326", dem_crs), points_lonlat)
+
 
 def _model_horizontal_scale_mm_per_meter(ds: rasterio.io.DatasetReader, window: rasterio.windows.Window, model_width_mm: float, model_height_mm: float) -> float:
     win_t = ds.window_transform(window)
@@ -36,8 +78,8 @@ def _model_horizontal_scale_mm_per_meter(ds: rasterio.io.DatasetReader, window:
         span_y_m = max(dy_units * unit_factor, 1e-6)
     else:
         left, bottom, right, top = rasterio.windows.bounds(window, ds.transform)
-        if ds.crs is not None and str(ds.crs).upper() != "EPSG:4326":
-            to_lonlat = Transformer.from_crs(ds.crs, "EPSG:4326", always_xy=True)
+        if ds.crs is not None and not _is_wgs84(ds.crs):
+            to_lonlat = _get_transformer(ds.crs, "EPSG:4326")
             lons, lats = to_lonlat.transform([left, right, left, right], [bottom, bottom, top, top])
             left, right = float(min(lons)), float(max(lons))
             bottom, top = float(min(lats)), float(max(lats))
@@ -95,6 +137,11 @@ class GenerateConfig:
     track_relief_mm: float = 0.6
     track_top_radius_mm: float = 0.8
 
+    # Blender backend: run the script through a pip-installed ``bpy`` module when available.
+    use_inprocess_bpy: bool = False
+    # Blender backend: keep one background Blender alive and feed it jobs (no per-run startup).
+    reuse_blender_process: bool = False
+
 
 def _compute_bbox(points: np.ndarray, margin_ratio: float) -> tuple[float, float, float, float]:
     minx, miny = points.min(axis=0)
@@ -150,7 +197,8 @@ def _clip_polyline_to_footprint(track_xy_mm: np.ndarray, model_width_mm: float,
     return _extract_segments(clipped)
 
 
-def _fetch_osm_line_layers(points_lonlat: np.ndarray, to_dem: Transformer, model_space: ModelSpace) -> dict[str, list[np.ndarray]]:
+def _fetch_osm_ways(points_lonlat: np.ndarray) -> list[tuple[str, np.ndarray]]:
+    """Download OSM ways around the track as (layer, Nx2 [lon, lat]) pairs; empty on network errors."""
     min_lon = float(np.min(points_lonlat[:, 0]))
     min_lat = float(np.min(points_lonlat[:, 1]))
     max_lon = float(np.max(points_lonlat[:, 0]))
@@ -171,38 +219,58 @@ def _fetch_osm_line_layers(points_lonlat: np.ndarray, to_dem: Transformer, model
 );
 out geom;
 """
-    layers = {"water": [], "green": [], "detail": []}
-
-    url = "https://overpass-api.de/api/interpreter?" + urlencode({"data": q})
+    ways: list[tuple[str, np.ndarray]] = []
     try:
-        payload = json.loads(urlopen(url, timeout=30).read().decode("utf-8"))
+        for el in iter_overpass_elements(q, timeout_s=30):
+            geom = el.get("geometry", [])
+            if len(geom) < 2:
+                continue
+
+            tags = el.get("tags", {})
+            if tags.get("natural") == "water" or "waterway" in tags:
+                category = "water"
+            elif tags.get("landuse") in {"forest", "meadow", "grass"} or tags.get("leisure") in {"park", "garden"}:
+                category = "green"
+            elif tags.get("highway") in {"motorway", "trunk", "primary", "secondary"}:
+                category = "detail"
+            else:
+                continue
+
+            coords = np.fromiter(
+                (c for p in geom for c in (float(p["lon"]), float(p["lat"]))), dtype=np.float64, count=2 * len(geom)
+            ).reshape(-1, 2)
+            ways.append((category, coords))
     except Exception:
+        return []
+
+    return ways
+
+
+def _project_osm_ways(
+    ways: list[tuple[str, np.ndarray]], to_dem: Transformer, model_space: ModelSpace
+) -> dict[str, list[np.ndarray]]:
+    layers: dict[str, list[np.ndarray]] = {"water": [], "green": [], "detail": []}
+    if not ways:
         return layers
 
-    for el in payload.get("elements", []):
-        geom = el.get("geometry", [])
-        if len(geom) < 2:
-            continue
-
-        lons = [float(p["lon"]) for p in geom]
-        lats = [float(p["lat"]) for p in geom]
-        xs_dem, ys_dem = to_dem.transform(lons, lats)
-        src_xy = np.column_stack((np.asarray(xs_dem, dtype=np.float64), np.asarray(ys_dem, dtype=np.float64)))
-        model_xy = model_space.to_model_xy(src_xy)
-
-        tags = el.get("tags", {})
-        if tags.get("natural") == "water" or "waterway" in tags:
-            layers["water"].append(model_xy)
-        elif tags.get("landuse") in {"forest", "meadow", "grass"} or tags.get("leisure") in {"park", "garden"}:
-            layers["green"].append(model_xy)
-        elif tags.get("highway") in {"motorway", "trunk", "primary", "secondary"}:
-            layers["detail"].append(model_xy)
+    # One pyproj call for every way instead of one per way.
+    lonlat = np.concatenate([coords for _, coords in ways])
+    model_xy = model_space.to_model_xy(_transform_xy(to_dem, lonlat))
+    split_at = np.cumsum([len(coords) for _, coords in ways])[:-1]
+    for (category, _), coords in zip(ways, np.split(model_xy, split_at)):
+        layers[category].append(coords)
 
     return layers
 
+
+def _write_stl(path: Path, mesh: trimesh.Trimesh) -> None:
+    # Binary STL straight from the NumPy exporter: skips the extension-based export dispatch.
+    Path(path).write_bytes(export_stl(mesh))
+
+
 def _export_mesh_or_remove(path: Path, mesh: trimesh.Trimesh) -> None:
     if mesh.faces.shape[0] > 0:
-        mesh.export(path)
+        _write_stl(path, mesh)
         return
     if path.exists():
         path.unlink()
@@ -213,72 +281,86 @@ def run_python_pipeline(
     dem_path: str | Path,
     stl_output_path: str | Path,
     config: GenerateConfig,
-) -> None:
+    progress_cb: ProgressFn = None,
+) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Generate the STL parts; return the non-empty parts as name -> (vertices, faces).
+
+    The returned arrays let callers build a 3MF without reloading the STLs.
+    ``progress_cb(percent, message)``, if given, is called at each stage.
+    """
+    progress = progress_cb or (lambda pct, msg: None)
+    progress(5, "lettura GPX")
     points_lonlat = load_gpx_points(gpx_path)
 
-    with rasterio.open(dem_path) as ds:
+    # The Overpass download only needs the GPX points: overlap it with the DEM read and gridding.
+    osm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="maps3d-osm")
+    osm_future = osm_executor.submit(_fetch_osm_ways, points_lonlat)
+    osm_executor.shutdown(wait=False)
+
+    with open_dem(dem_path) as ds:
         if ds.crs is None:
             raise ValueError("Il DEM non ha CRS definito.")
 
-        to_dem = Transformer.from_crs("EPSG:4326", ds.crs, always_xy=True)
-        x_dem, y_dem = to_dem.transform(points_lonlat[:, 0], points_lonlat[:, 1])
-        points_dem = np.column_stack((x_dem, y_dem))
+        to_dem = _get_transformer("EPSG:4326", ds.crs)
+        points_dem = _lonlat_to_dem_points(points_lonlat, ds.crs)
 
         minx, miny, maxx, maxy = _compute_bbox(points_dem, config.bbox_margin_ratio)
 
-        window = rasterio.windows.from_bounds(minx, miny, maxx, maxy, transform=ds.transform)
-        window = window.round_offsets().round_lengths()
+        window = clipped_bbox_window(ds, minx, miny, maxx, maxy)
 
-        data = ds.read(1, window=window, masked=True)
-        if data.size == 0:
-            raise ValueError("Ritaglio DEM vuoto: controlla GPX e DEM.")
+        # float32 is plenty for elevations and halves the bytes moved by every per-pixel pass.
+        data = read_dem_window(ds, window, masked=True)
 
-        dem = np.asarray(data.astype(np.float64).filled(np.nan), dtype=np.float64)
+        # Work on the read buffer directly (no filled() copy); masked/non-finite cells get min_elev.
+        dem = np.ma.getdata(data)
         finite = np.isfinite(dem)
+        finite &= ~np.ma.getmaskarray(data)
         if not np.any(finite):
             raise ValueError("Ritaglio DEM privo di valori validi.")
 
-        min_elev = float(np.nanmin(dem))
-        dem = np.where(np.isfinite(dem), dem, min_elev)
+        min_elev = float(np.min(dem, where=finite, initial=np.inf))
+        np.copyto(dem, np.float32(min_elev), where=~finite)
 
         win_t = ds.window_transform(window)
         rows, cols = dem.shape
-        cols_idx = np.arange(cols)
-        rows_idx = np.arange(rows)
-
-        x_coords = win_t.c + (cols_idx + 0.5) * win_t.a
-        y_coords = win_t.f + (rows_idx + 0.5) * win_t.e
-
-        x_min, x_max = float(np.min(x_coords)), float(np.max(x_coords))
-        y_min, y_max = float(np.min(y_coords)), float(np.max(y_coords))
 
+        # Pixel-centre coordinates of the first/last column and row: the grid is regular,
+        # so the model axes are evenly spaced over the model size.
+        x_first = win_t.c + 0.5 * win_t.a
+        y_first = win_t.f + 0.5 * win_t.e
         model_space = ModelSpace.from_source_bounds(
-            src_min_x=x_min,
-            src_max_x=x_max,
-            src_min_y=y_min,
-            src_max_y=y_max,
+            src_min_x=x_first,
+            src_max_x=x_first + (cols - 1) * win_t.a,
+            src_min_y=y_first,
+            src_max_y=y_first + (rows - 1) * win_t.e,
             model_width_mm=config.model_width_mm,
             model_height_mm=config.model_height_mm,
         )
 
-        x_mm = model_space.to_model_x(x_coords)
-        y_mm = model_space.to_model_y(y_coords)
+        x_mm = np.linspace(0.0, config.model_width_mm if cols > 1 else 0.0, cols)
+        y_mm = np.linspace(0.0, config.model_height_mm if rows > 1 else 0.0, rows)
 
-        if x_mm[0] > x_mm[-1]:
-            x_mm = x_mm[::-1]
-            dem = np.fliplr(dem)
-        if y_mm[0] > y_mm[-1]:
-            y_mm = y_mm[::-1]
-            dem = np.flipud(dem)
+        # Orient the grid so both model axes increase (views, no copy); north-up DEMs flip rows.
+        if win_t.a < 0:
+            dem = dem[:, ::-1]
+        if win_t.e < 0:
+            dem = dem[::-1]
 
         horiz_scale_mm_per_meter = _model_horizontal_scale_mm_per_meter(ds, window, config.model_width_mm, config.model_height_mm)
-        z_mm = (dem - min_elev) * horiz_scale_mm_per_meter * config.vertical_scale
+        # One subtraction pass plus one in-place scale (no chain of full-grid temporaries).
+        z_mm = dem - np.float32(min_elev)
+        z_mm *= np.float32(horiz_scale_mm_per_meter * config.vertical_scale)
 
         track_xy_mm = model_space.to_model_xy(points_dem)
-        osm_layers = _fetch_osm_line_layers(points_lonlat, to_dem=to_dem, model_space=model_space)
 
+    progress(25, "DEM letto, attendo dati OSM")
+    osm_layers = _project_osm_ways(osm_future.result(), to_dem=to_dem, model_space=model_space)
+
+    progress(40, "mesh terreno")
     terrain_mesh = build_terrain_mesh(x_mm=x_mm, y_mm=y_mm, z_mm=z_mm, base_thickness_mm=config.base_thickness_mm)
 
+    progress(60, "mesh traccia, layer OSM e cornice")
+
     clipped_track_segments = _clip_polyline_to_footprint(track_xy_mm, config.model_width_mm, config.model_height_mm)
     track_mesh = build_line_layer_mesh(
         line_segments_xy_mm=clipped_track_segments,
@@ -346,21 +428,29 @@ def run_python_pipeline(
     if terrain_mesh.faces.shape[0] == 0:
         raise ValueError("Mesh base vuota, impossibile esportare STL.")
 
+    progress(75, "scrittura STL")
     out_paths = _python_output_paths(stl_output_path, config.test_mode)
     out_paths["base"].parent.mkdir(parents=True, exist_ok=True)
 
-    _export_mesh_or_remove(out_paths["base"], terrain_mesh)
-    _export_mesh_or_remove(out_paths["track"], track_mesh)
-    _export_mesh_or_remove(out_paths["water"], water_mesh)
-    _export_mesh_or_remove(out_paths["green"], green_mesh)
-    _export_mesh_or_remove(out_paths["detail"], detail_mesh)
-    _export_mesh_or_remove(out_paths["frame"], frame_mesh)
-    combined_meshes = [terrain_mesh]
-    for mesh in (track_mesh, water_mesh, green_mesh, detail_mesh):
-        if mesh.faces.shape[0] > 0:
-            combined_meshes.append(mesh)
-    final_mesh = trimesh.util.concatenate(combined_meshes)
-    final_mesh.export(out_paths["combined"])
+    parts = {
+        "base": terrain_mesh,
+        "track": track_mesh,
+        "water": water_mesh,
+        "green": green_mesh,
+        "detail": detail_mesh,
+        "frame": frame_mesh,
+    }
+    for name, mesh in parts.items():
+        _export_mesh_or_remove(out_paths[name], mesh)
+    # The parts are disjoint: stack them with offset face indices (no trimesh merge/visual bookkeeping).
+    vertices, faces = _stack_arrays(
+        [(mesh.vertices, mesh.faces) for mesh in (terrain_mesh, track_mesh, water_mesh, green_mesh, detail_mesh)]
+    )
+    final_mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    _write_stl(out_paths["combined"], final_mesh)
+    progress(100, "STL scritti")
+
+    return {name: (mesh.vertices, mesh.faces) for name, mesh in parts.items() if mesh.faces.shape[0] > 0}
 
 
 def run_pipeline(
@@ -370,11 +460,13 @@ def run_pipeline(
     config: GenerateConfig,
     backend: str = "python",
     blender_exe_path: str | None = None,
-) -> None:
+    progress_cb: ProgressFn = None,
+) -> dict[str, tuple[np.ndarray, np.ndarray]] | None:
+    """Run the chosen backend. The Python backend also returns its parts in memory and
+    reports stage progress through ``progress_cb`` (see run_python_pipeline)."""
     backend_norm = backend.strip().lower()
     if backend_norm == "python":
-        run_python_pipeline(gpx_path, dem_path, stl_output_path, config)
-        return
+        return run_python_pipeline(gpx_path, dem_path, stl_output_path, config, progress_cb=progress_cb)
 
     if backend_norm == "blender":
         from .blender_backend import run_blender_pipeline
@@ -386,7 +478,7 @@ def run_pipeline(
             params=config,
             blender_exe_path=blender_exe_path,
         )
-        return
+        return None
 
     raise ValueError(f"Backend non supportato: {backend}. Usa 'python' o 'blender'.")
 
@@ -407,33 +499,64 @@ def default_dem_output_path_for_gpx(gpx_path: str | Path) -> Path:
 
 
 def estimate_relief_mm(gpx_path: str | Path, dem_path: str | Path, params: GenerateConfig) -> float:
+    """Estimated max relief (mm) of the model.
+
+    The unscaled relief is cached per (GPX file, DEM file, mtime/size, bbox margin, model size);
+    the vertical scale is applied on top, so changing it alone doesn't re-read the DEM.
+    """
+    gpx = Path(gpx_path).resolve()
+    dem = Path(dem_path).resolve()
+    gpx_stat = gpx.stat()
+    dem_stat = dem.stat()
+    relief_mm_unscaled = _estimate_relief_cached(
+        str(gpx),
+        gpx_stat.st_mtime_ns,
+        gpx_stat.st_size,
+        str(dem),
+        dem_stat.st_mtime_ns,
+        dem_stat.st_size,
+        params.bbox_margin_ratio,
+        params.model_width_mm,
+        params.model_height_mm,
+    )
+    return float(relief_mm_unscaled * params.vertical_scale)
+
+
+@lru_cache(maxsize=16)
+def _estimate_relief_cached(
+    gpx_path: str,
+    gpx_mtime_ns: int,
+    gpx_size: int,
+    dem_path: str,
+    dem_mtime_ns: int,
+    dem_size: int,
+    bbox_margin_ratio: float,
+    model_width_mm: float,
+    model_height_mm: float,
+) -> float:
     points_lonlat = load_gpx_points(gpx_path)
-    with rasterio.open(dem_path) as ds:
+    with open_dem(dem_path) as ds:
         if ds.crs is None:
             raise ValueError("Il DEM non ha CRS definito.")
 
-        to_dem = Transformer.from_crs("EPSG:4326", ds.crs, always_xy=True)
-        x_dem, y_dem = to_dem.transform(points_lonlat[:, 0], points_lonlat[:, 1])
-        points_dem = np.column_stack((x_dem, y_dem))
+        points_dem = _lonlat_to_dem_points(points_lonlat, ds.crs)
 
-        minx, miny, maxx, maxy = _compute_bbox(points_dem, params.bbox_margin_ratio)
-        window = rasterio.windows.from_bounds(minx, miny, maxx, maxy, transform=ds.transform)
-        window = window.round_offsets().round_lengths()
+        minx, miny, maxx, maxy = _compute_bbox(points_dem, bbox_margin_ratio)
+        window = clipped_bbox_window(ds, minx, miny, maxx, maxy)
 
-        data = ds.read(1, window=window, masked=True)
-        if data.size == 0:
-            raise ValueError("Ritaglio DEM vuoto: controlla GPX e DEM.")
+        data = read_dem_window(ds, window, masked=True)
 
-        dem = np.asarray(data.astype(np.float64).filled(np.nan), dtype=np.float64)
+        dem = np.ma.getdata(data)
         finite = np.isfinite(dem)
+        finite &= ~np.ma.getmaskarray(data)
         if not np.any(finite):
             raise ValueError("Ritaglio DEM privo di valori validi.")
 
-        z_min = float(np.nanmin(dem))
-        z_max = float(np.nanmax(dem))
+        z_min = float(np.min(dem, where=finite, initial=np.inf))
+        z_max = float(np.max(dem, where=finite, initial=-np.inf))
 
         horiz_scale_mm_per_meter = _model_horizontal_scale_mm_per_meter(
-            ds, window, params.model_width_mm, params.model_height_mm
+            ds, window, model_width_mm, model_height_mm
         )
 
-    return float((z_max - z_min) * horiz_scale_mm_per_meter * params.vertical_scale)
+    return (z_max - z_min) * horiz_scale_mm_per_meter
@@ -3,12 +3,19 @@ from __future__ import annotations
 import json
 import math
 import sys
+import traceback
 from pathlib import Path
 
 import bmesh
 import bpy
+import numpy as np
 from mathutils import Vector
 
+try:
+    from numba import njit
+except ImportError:  # Blender's Python rarely ships numba: the NumPy densify is used instead
+    njit = None
+
 
 def _stage_log(stage: str, message: str) -> None:
     print(f"[maps3d][stage] {stage}: {message}", flush=True)
@@ -40,7 +47,41 @@ def _enable_smooth_shading(obj: bpy.types.Object) -> None:
         obj.data.auto_smooth_angle = math.radians(40.0)
 
 
-def _apply_boolean(base: bpy.types.Object, tool: bpy.types.Object, op: str) -> None:
+def _world_aabb(obj: bpy.types.Object) -> tuple[Vector, Vector]:
+    corners = [obj.matrix_world @ Vector(c) for c in obj.bound_box]
+    lo = Vector((min(c.x for c in corners), min(c.y for c in corners), min(c.z for c in corners)))
+    hi = Vector((max(c.x for c in corners), max(c.y for c in corners), max(c.z for c in corners)))
+    return lo, hi
+
+
+def _aabbs_overlap(a: bpy.types.Object, b: bpy.types.Object) -> bool:
+    a_lo, a_hi = _world_aabb(a)
+    b_lo, b_hi = _world_aabb(b)
+    return all(a_lo[i] <= b_hi[i] and b_lo[i] <= a_hi[i] for i in range(3))
+
+
+def _set_boolean_solver(mod: bpy.types.Modifier, solver: str) -> None:
+    try:
+        mod.solver = solver
+    except TypeError:
+        if solver != "FAST":
+            raise
+        mod.solver = "FLOAT"  # "FAST" was renamed "FLOAT" in Blender 4.5 (Manifold solver added)
+
+
+def _apply_boolean(
+    base: bpy.types.Object, tool: bpy.types.Object, op: str, solver: str = "EXACT", keep_tool: bool = False
+) -> None:
+    """Apply a boolean ``op`` of ``tool`` on ``base``; the tool is deleted unless ``keep_tool``.
+
+    EXACT is robust on arbitrary meshes (terrain, curves); FAST is much cheaper and fine
+    for cuts with simple primitive tools such as the frame cubes/cylinders.
+    """
+    if op == "DIFFERENCE" and not _aabbs_overlap(base, tool):
+        _stage_log("boolean", f"skip op={op} base={base.name} tool={tool.name} reason=disjoint_bounds")
+        if not keep_tool:
+            bpy.data.objects.remove(tool, do_unlink=True)
+        return
     base_polys = len(base.data.polygons) if base.type == "MESH" and base.data else -1
     tool_polys = len(tool.data.polygons) if tool.type == "MESH" and tool.data else -1
     max_per_mesh = 900000
@@ -50,17 +91,22 @@ def _apply_boolean(base: bpy.types.Object, tool: bpy.types.Object, op: str) -> N
             "boolean",
             f"skip op={op} base={base.name} tool={tool.name} base_polys={base_polys} tool_polys={tool_polys} reason=density_guard",
         )
-        bpy.data.objects.remove(tool, do_unlink=True)
+        if not keep_tool:
+            bpy.data.objects.remove(tool, do_unlink=True)
         return
-    _stage_log("boolean", f"start op={op} base={base.name} tool={tool.name} base_polys={base_polys} tool_polys={tool_polys}")
+    _stage_log(
+        "boolean",
+        f"start op={op} solver={solver} base={base.name} tool={tool.name} base_polys={base_polys} tool_polys={tool_polys}",
+    )
     mod = base.modifiers.new(name=f"Bool_{op}", type="BOOLEAN")
     mod.operation = op
-    mod.solver = "EXACT"
+    _set_boolean_solver(mod, solver)
     mod.object = tool
     bpy.context.view_layer.objects.active = base
     bpy.ops.object.modifier_apply(modifier=mod.name)
     _stage_log("boolean", f"end op={op} base_polys={len(base.data.polygons) if base.type == 'MESH' and base.data else -1}")
-    bpy.data.objects.remove(tool, do_unlink=True)
+    if not keep_tool:
+        bpy.data.objects.remove(tool, do_unlink=True)
 
 
 def _debug_log(message: str) -> None:
@@ -160,101 +206,175 @@ def _simplify_mesh_for_boolean(mesh_obj: bpy.types.Object, target_polys: int) ->
     return after < current
 
 
+def _densify(src: np.ndarray, seg: np.ndarray, step_mm: float) -> np.ndarray:
+    """Split every non-degenerate segment into ceil(len/step) equal pieces, all segments at once."""
+    keep = np.flatnonzero(seg >= 1e-6)
+    pieces = np.maximum(1, np.ceil(seg[keep] / step_mm).astype(np.int64))
+    seg_idx = np.repeat(keep, pieces)
+    piece_pieces = np.repeat(pieces, pieces)
+    j = np.arange(1, len(seg_idx) + 1) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    t = (j / piece_pieces)[:, None]
+    p0 = src[seg_idx]
+    return np.vstack((src[:1], p0 + (src[seg_idx + 1] - p0) * t))
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _densify_jit(xs: np.ndarray, ys: np.ndarray, step_mm: float) -> np.ndarray:
+        # Same subdivision as _densify, in one pass over a preallocated output.
+        n = xs.shape[0]
+        total = 1
+        for i in range(1, n):
+            seg = math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1])
+            if seg >= 1e-6:
+                total += max(1, int(math.ceil(seg / step_mm)))
+
+        out = np.empty((total, 2), dtype=np.float64)
+        out[0, 0] = xs[0]
+        out[0, 1] = ys[0]
+        k = 1
+        for i in range(1, n):
+            x0, y0, x1, y1 = xs[i - 1], ys[i - 1], xs[i], ys[i]
+            seg = math.hypot(x1 - x0, y1 - y0)
+            if seg < 1e-6:
+                continue
+            pieces = max(1, int(math.ceil(seg / step_mm)))
+            for j in range(1, pieces + 1):
+                t = j / pieces
+                out[k, 0] = x0 + (x1 - x0) * t
+                out[k, 1] = y0 + (y1 - y0) * t
+                k += 1
+        return out
+
+else:
+    _densify_jit = None
+
+
 def _resample_track(points: list[list[float]], step_mm: float = 1.0, max_points: int = 50000) -> list[tuple[float, float]]:
     if len(points) < 2:
         return []
 
-    src: list[tuple[float, float]] = []
-    for p in points:
-        if len(p) < 2:
-            continue
-        x = float(p[0])
-        y = float(p[1])
-        if not math.isfinite(x) or not math.isfinite(y):
-            continue
-        src.append((x, y))
+    src = np.array([p[:2] for p in points if len(p) >= 2], dtype=np.float64).reshape(-1, 2)
+    src = src[np.isfinite(src).all(axis=1)]
     if len(src) < 2:
         return []
 
-    total_len = 0.0
-    for i in range(1, len(src)):
-        total_len += math.hypot(src[i][0] - src[i - 1][0], src[i][1] - src[i - 1][1])
+    seg = np.hypot(np.diff(src[:, 0]), np.diff(src[:, 1]))
+    total_len = float(seg.sum())
 
     safe_step = max(0.001, float(step_mm))
     max_points = max(1000, int(max_points))
     adaptive_step = max(safe_step, total_len / max_points) if total_len > 0.0 else safe_step
 
-    out: list[tuple[float, float]] = [src[0]]
-    for i in range(1, len(src)):
-        x0, y0 = src[i - 1]
-        x1, y1 = src[i]
-        seg = math.hypot(x1 - x0, y1 - y0)
-        if seg < 1e-6:
-            continue
-        pieces = max(1, int(math.ceil(seg / adaptive_step)))
-        for j in range(1, pieces + 1):
-            t = j / pieces
-            out.append((x0 + (x1 - x0) * t, y0 + (y1 - y0) * t))
+    if _densify_jit is not None:
+        out = _densify_jit(src[:, 0].copy(), src[:, 1].copy(), adaptive_step)
+    else:
+        out = _densify(src, seg, adaptive_step)
 
     if len(out) > max_points:
         stride = int(math.ceil(len(out) / max_points))
         out = out[::stride]
-        if out[-1] != src[-1]:
-            out.append(src[-1])
+        if not np.array_equal(out[-1], src[-1]):
+            out = np.vstack((out, src[-1:]))
 
     _debug_log(
         f"resample src_points={len(src)} total_len_mm={total_len:.3f} step_mm={adaptive_step:.6f} out_points={len(out)} cap={max_points}"
     )
-    return out if len(out) >= 2 else src
+    result = out if len(out) >= 2 else src
+    return list(zip(result[:, 0].tolist(), result[:, 1].tolist()))
 
 
 def _apply_rim_flatten(terrain: bpy.types.Object, size_x: float, size_y: float, rim_mm: float) -> None:
     if rim_mm <= 0.0:
         return
     mesh = terrain.data
-    for v in mesh.vertices:
-        d = min(v.co.x, size_x - v.co.x, v.co.y, size_y - v.co.y)
-        if d <= 0:
-            v.co.z = 0.0
-        elif d < rim_mm and v.co.z > 0.0:
-            v.co.z *= d / rim_mm
+    co32 = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co32)
+    co = co32.reshape(-1, 3).astype(np.float64)
+    x, y, z = co[:, 0], co[:, 1], co[:, 2]
+
+    d = np.minimum(np.minimum(x, size_x - x), np.minimum(y, size_y - y))
+    ramp = (d > 0.0) & (d < rim_mm) & (z > 0.0)
+    z[ramp] *= d[ramp] / rim_mm
+    z[d <= 0.0] = 0.0
+
+    co32[2::3] = z
+    mesh.vertices.foreach_set("co", co32)
     mesh.update()
 
 
+def _sample_heightmap(heights: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Bilinear sample of a heightmap at UVs in [0, 1] (pixel centres), returned in [0, 1].
+
+    Rows follow the image convention the old Displace texture used: v=0 is the last row.
+    """
+    rows, cols = heights.shape
+    px = np.clip(u * cols - 0.5, 0.0, cols - 1)
+    py = np.clip((1.0 - v) * rows - 0.5, 0.0, rows - 1)
+    x0 = np.minimum(px.astype(np.int64), max(cols - 2, 0))
+    y0 = np.minimum(py.astype(np.int64), max(rows - 2, 0))
+    x1 = np.minimum(x0 + 1, cols - 1)
+    y1 = np.minimum(y0 + 1, rows - 1)
+    tx = (px - x0)[None, :]
+    ty = (py - y0)[:, None]
+
+    h = np.asarray(heights, dtype=np.float32)
+    top = h[np.ix_(y0, x0)] * (1.0 - tx) + h[np.ix_(y0, x1)] * tx
+    bottom = h[np.ix_(y1, x0)] * (1.0 - tx) + h[np.ix_(y1, x1)] * tx
+    return (top * (1.0 - ty) + bottom * ty) / 65535.0
+
+
+def _grid_mesh(name: str, xs: np.ndarray, ys: np.ndarray, z: np.ndarray) -> bpy.types.Mesh:
+    """Quad grid mesh (normals +Z) with vertex (r, c) at (xs[c], ys[r], z[r, c])."""
+    rows, cols = z.shape
+    coords = np.empty((rows, cols, 3), dtype=np.float32)
+    coords[..., 0] = xs[None, :]
+    coords[..., 1] = ys[:, None]
+    coords[..., 2] = z
+
+    idx = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+    quads = np.stack((idx[:-1, :-1], idx[:-1, 1:], idx[1:, 1:], idx[1:, :-1]), axis=-1).reshape(-1, 4)
+    n_quads = len(quads)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(rows * cols)
+    mesh.vertices.foreach_set("co", coords.ravel())
+    mesh.loops.add(n_quads * 4)
+    mesh.loops.foreach_set("vertex_index", quads.ravel())
+    mesh.polygons.add(n_quads)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, n_quads * 4, 4, dtype=np.int32))
+    try:
+        mesh.polygons.foreach_set("loop_total", np.full(n_quads, 4, dtype=np.int32))
+    except (AttributeError, TypeError, RuntimeError):
+        pass  # read-only (derived from loop_start) since Blender 4.0
+    mesh.update(calc_edges=True)
+    return mesh
+
+
 def _create_terrain(job: dict) -> bpy.types.Object:
     size_x = float(job["size_mm_x"])
     size_y = float(job["size_mm_y"])
     base_mm = float(job["base_mm"])
     grid_res = _safe_int(job.get("grid_res", 400), default=400, min_value=2, max_value=1600, label="grid_res")
-    est_vertices = grid_res * grid_res
+    est_vertices = (grid_res + 1) * (grid_res + 1)
     _stage_log("terrain", f"begin size=({size_x:.3f},{size_y:.3f}) base_mm={base_mm:.3f} grid_res={grid_res} est_vertices={est_vertices}")
 
-    bpy.ops.mesh.primitive_grid_add(
-        x_subdivisions=grid_res,
-        y_subdivisions=grid_res,
-        size=1.0,
-        location=(size_x / 2.0, size_y / 2.0, 0.0),
-    )
-    terrain = bpy.context.active_object
-    terrain.name = "Terrain"
-    terrain.scale = (size_x / 2.0, size_y / 2.0, 1.0)
-    bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-
     _stage_log("terrain", f"loading heightmap path={job['heightmap_path']}")
-    image = bpy.data.images.load(job["heightmap_path"])
-    _stage_log("terrain", f"heightmap size={image.size[0]}x{image.size[1]}")
-    tex = bpy.data.textures.new("HeightmapTex", type="IMAGE")
-    tex.image = image
-
-    displace = terrain.modifiers.new(name="Displace", type="DISPLACE")
-    displace.texture = tex
-    displace.texture_coords = "UV"
-    displace.strength = float(job.get("z_scale", 1.0)) * float(job.get("z_range_mm", 0.0))
-    displace.mid_level = 0.0
-
-    _stage_log("terrain", f"apply displace strength={displace.strength:.6f}")
-    bpy.context.view_layer.objects.active = terrain
-    bpy.ops.object.modifier_apply(modifier=displace.name)
+    heights = np.load(job["heightmap_path"], mmap_mode="r")
+    _stage_log("terrain", f"heightmap size={heights.shape[1]}x{heights.shape[0]}")
+
+    # Build the displaced grid directly (grid_res subdivisions per side, like primitive_grid_add):
+    # no heightmap image, texture or Displace modifier round-trip.
+    strength = float(job.get("z_scale", 1.0)) * float(job.get("z_range_mm", 0.0))
+    uv = np.linspace(0.0, 1.0, grid_res + 1)
+    z = _sample_heightmap(heights, uv, uv) * strength
+    _stage_log("terrain", f"displace strength={strength:.6f}")
+
+    mesh = _grid_mesh("Terrain", uv * size_x, uv * size_y, z)
+    terrain = bpy.data.objects.new("Terrain", mesh)
+    bpy.context.collection.objects.link(terrain)
+    _set_object_active_selected(terrain)
     _apply_rim_flatten(terrain, size_x, size_y, float(job.get("rim_mm", 3.0)))
 
     _stage_log("terrain", f"post-displace verts={len(terrain.data.vertices)} faces={len(terrain.data.polygons)}")
@@ -278,8 +398,10 @@ def _curve_from_points(points: list[tuple[float, float]], name: str) -> bpy.type
     cdata.resolution_u = 1 if len(points) > 2000 else 6
     spline = cdata.splines.new(type="POLY")
     spline.points.add(len(points) - 1)
-    for i, (x, y) in enumerate(points):
-        spline.points[i].co = (x, y, 0.0, 1.0)
+    co = np.zeros((len(points), 4), dtype=np.float32)
+    co[:, :2] = points
+    co[:, 3] = 1.0
+    spline.points.foreach_set("co", co.ravel())
     cobj = bpy.data.objects.new(name, cdata)
     bpy.context.collection.objects.link(cobj)
     _debug_log(
@@ -458,12 +580,6 @@ def _make_layer_from_curves(curves: list[bpy.types.Object], terrain: bpy.types.O
         _set_object_active_selected(c)
         m = _curve_to_mesh(c, c.name)
 
-        solid = m.modifiers.new(name="Solid", type="SOLIDIFY")
-        solid.thickness = max(0.4, thickness)
-        solid.offset = 0.0
-        _set_object_active_selected(m)
-        bpy.ops.object.modifier_apply(modifier=solid.name)
-
         _stage_log(
             "ams",
             f"layer={name} part={idx} verts={len(m.data.vertices)} polys={len(m.data.polygons)} "
@@ -481,6 +597,11 @@ def _make_layer_from_curves(curves: list[bpy.types.Object], terrain: bpy.types.O
 
     base.name = name
     _set_object_active_selected(base)
+    # Parts are disjoint, so one solidify on the joined mesh matches solidifying each part.
+    solid = base.modifiers.new(name="Solid", type="SOLIDIFY")
+    solid.thickness = max(0.4, thickness)
+    solid.offset = 0.0
+    bpy.ops.object.modifier_apply(modifier=solid.name)
     bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
     bm = bmesh.new()
     bm.from_mesh(base.data)
@@ -586,7 +707,7 @@ def _add_finger_notches(frame: bpy.types.Object, size_x: float, radius: float, z
             location=(x_pos, 0.0, z_level),
             rotation=(math.radians(90), 0.0, 0.0),
         )
-        _apply_boolean(frame, bpy.context.active_object, "DIFFERENCE")
+        _apply_boolean(frame, bpy.context.active_object, "DIFFERENCE", solver="FAST")
 
 
 def _create_frame(job: dict) -> bpy.types.Object:
@@ -612,7 +733,7 @@ def _create_frame(job: dict) -> bpy.types.Object:
     top_cut = bpy.context.active_object
     top_cut.scale = ((size_x + clearance) / 2.0, (size_y + clearance) / 2.0, top_big_depth / 2.0 + 1.0)
     bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-    _apply_boolean(frame, top_cut, "DIFFERENCE")
+    _apply_boolean(frame, top_cut, "DIFFERENCE", solver="FAST")
 
     bpy.ops.mesh.primitive_cube_add(location=(size_x / 2.0, size_y / 2.0, frame_h - top_big_depth - seat_depth / 2.0))
     seat_cut = bpy.context.active_object
@@ -622,7 +743,7 @@ def _create_frame(job: dict) -> bpy.types.Object:
         seat_depth / 2.0 + 1.0,
     )
     bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-    _apply_boolean(frame, seat_cut, "DIFFERENCE")
+    _apply_boolean(frame, seat_cut, "DIFFERENCE", solver="FAST")
 
     _add_finger_notches(frame, size_x, float(job.get("finger_notch_radius_mm", 7.0)), frame_h - recess_mm)
     _enable_smooth_shading(frame)
@@ -630,13 +751,20 @@ def _create_frame(job: dict) -> bpy.types.Object:
     return frame
 
 
-def _make_test_map(map_obj: bpy.types.Object, test_size: float, size_x: float, size_y: float) -> bpy.types.Object:
+def _make_test_maps(
+    map_objs: list[bpy.types.Object | None], test_size: float, size_x: float, size_y: float
+) -> list[bpy.types.Object | None]:
+    """Cut every object to the central test square with one shared cutter (None entries pass through)."""
     bpy.ops.mesh.primitive_cube_add(location=(size_x / 2.0, size_y / 2.0, 0.0))
     cutter = bpy.context.active_object
     cutter.scale = (test_size / 2.0, test_size / 2.0, 1000.0)
     bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-    _apply_boolean(map_obj, cutter, "INTERSECT")
-    return map_obj
+    # Axis-aligned box far taller than the map: no coplanar faces, so FAST cuts cleanly.
+    for map_obj in map_objs:
+        if map_obj is not None:
+            _apply_boolean(map_obj, cutter, "INTERSECT", solver="FAST", keep_tool=True)
+    bpy.data.objects.remove(cutter, do_unlink=True)
+    return map_objs
 
 
 def _create_test_frame_corner(job: dict) -> bpy.types.Object:
@@ -647,11 +775,15 @@ def _create_test_frame_corner(job: dict) -> bpy.types.Object:
     fh = float(job["frame_height_mm"])
     wx = float(job["frame_wall_mm"])
 
-    bpy.ops.mesh.primitive_cube_add(location=(sx + wx - test_size / 2.0, sy + wx - test_size / 2.0, fh / 2.0))
+    # The corner ends at the outer walls (sx + wx, sy + wx): the cutter overshoots them by
+    # 1 mm so none of its faces is coplanar with the frame's, which FAST doesn't handle.
+    overshoot = 1.0
+    half = (test_size + overshoot) / 2.0
+    bpy.ops.mesh.primitive_cube_add(location=(sx + wx + overshoot - half, sy + wx + overshoot - half, fh / 2.0))
     cutter = bpy.context.active_object
-    cutter.scale = (test_size / 2.0, test_size / 2.0, fh)
+    cutter.scale = (half, half, fh)
     bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-    _apply_boolean(frame, cutter, "INTERSECT")
+    _apply_boolean(frame, cutter, "INTERSECT", solver="FAST")
     return frame
 
 
@@ -802,23 +934,60 @@ def _mesh_bounds_str(obj: bpy.types.Object | None) -> str:
     )
 
 
+_STL_TRIANGLE = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+
+
+def _write_binary_stl(obj: bpy.types.Object, path: Path) -> None:
+    """Write the evaluated, world-space triangles of ``obj`` as binary STL straight from NumPy.
+
+    Same result as export_mesh.stl with its defaults (modifiers applied, no axis change),
+    without the operator round-trip or per-triangle Python work.
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tris)
+    finally:
+        eval_obj.to_mesh_clear()
+
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    verts = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    corners = verts[tris.reshape(-1, 3)]
+
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0.0)
+
+    records = np.zeros(len(corners), dtype=_STL_TRIANGLE)
+    records["normal"] = normals
+    records["vertices"] = corners
+    with path.open("wb") as fh:
+        fh.write(b"Maps3D binary STL".ljust(80, b"\0"))
+        fh.write(np.uint32(len(records)).tobytes())
+        records.tofile(fh)
+
+
 def _export_stl(obj: bpy.types.Object | None, path: Path) -> None:
     if obj is None:
         _stage_log("export", f"skip none object -> {path}")
         return
     path.parent.mkdir(parents=True, exist_ok=True)
-    bpy.ops.object.select_all(action="DESELECT")
-    obj.select_set(True)
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.export_mesh.stl(filepath=str(path), use_selection=True)
+    _write_binary_stl(obj, path)
 
 
-def main() -> None:
+def main(job_path: str | Path | None = None) -> None:
     _stage_log("startup", f"argv={sys.argv}")
-    if "--" not in sys.argv:
-        raise RuntimeError("Percorso job.json mancante")
+    if job_path is None:
+        if "--" not in sys.argv:
+            raise RuntimeError("Percorso job.json mancante")
+        job_path = sys.argv[sys.argv.index("--") + 1]
 
-    job_path = Path(sys.argv[sys.argv.index("--") + 1])
+    job_path = Path(job_path)
     _stage_log("job", f"loading job json from {job_path}")
     raw_job = job_path.read_text(encoding="utf-8")
     job = json.loads(raw_job)
@@ -841,13 +1010,22 @@ def main() -> None:
     _stage_log("terrain", "before terrain creation")
     base = _create_terrain(job)
     _stage_log("terrain", f"after terrain creation base={base.name} polys={len(base.data.polygons)}")
-    terrain_for_layers = base.copy()
-    terrain_for_layers.data = base.data.copy()
+    # Shrinkwrap target for the track and the AMS layers: a second object sharing the terrain
+    # mesh (no copy). Shrinkwrap is baked when the curves become meshes, so the target is
+    # removed before the groove boolean modifies base.data (modifiers can't apply to shared data).
+    terrain_for_layers = bpy.data.objects.new("TerrainShrinkwrapTarget", base.data)
+    terrain_for_layers.matrix_world = base.matrix_world.copy()
     bpy.context.collection.objects.link(terrain_for_layers)
 
     _stage_log("track", "before track inlay creation")
     groove, track_inlay = _create_track_inlay(job, terrain_for_layers)
     _stage_log("track", f"after track inlay creation groove={groove is not None} track={track_inlay is not None}")
+
+    _stage_log("ams", "before AMS layer creation")
+    water, green, detail = _build_ams_layers(job, terrain_for_layers)
+    _stage_log("ams", f"after AMS layer creation water={water is not None} green={green is not None} detail={detail is not None}")
+    bpy.data.objects.remove(terrain_for_layers, do_unlink=True)
+
     if groove is not None:
         terrain_xy_guard = 1.03
         track_dx = track_inlay.dimensions.x if track_inlay is not None else 0.0
@@ -879,23 +1057,11 @@ def main() -> None:
             )
             _apply_boolean(base, groove, "DIFFERENCE")
 
-    _stage_log("ams", "before AMS layer creation")
-    water, green, detail = _build_ams_layers(job, terrain_for_layers)
-    _stage_log("ams", f"after AMS layer creation water={water is not None} green={green is not None} detail={detail is not None}")
-
     if bool(job.get("test_mode", False)):
         ts = float(job.get("test_size_mm", 40.0))
         sx = float(job["size_mm_x"])
         sy = float(job["size_mm_y"])
-        base = _make_test_map(base, ts, sx, sy)
-        if water is not None:
-            water = _make_test_map(water, ts, sx, sy)
-        if green is not None:
-            green = _make_test_map(green, ts, sx, sy)
-        if detail is not None:
-            detail = _make_test_map(detail, ts, sx, sy)
-        if track_inlay is not None:
-            track_inlay = _make_test_map(track_inlay, ts, sx, sy)
+        base, water, green, detail, track_inlay = _make_test_maps([base, water, green, detail, track_inlay], ts, sx, sy)
 
     water = _enforce_xy_footprint(water, base, "water")
     green = _enforce_xy_footprint(green, base, "green")
@@ -927,6 +1093,35 @@ def main() -> None:
         _export_stl(frame_obj, out_frame)
 
 
+# Must match blender_backend._WORKER_DONE_TAG: marks the end of one job in worker mode.
+_WORKER_DONE_TAG = "[maps3d][worker] done"
+
+
+def _worker_loop() -> None:
+    """Serve job.json paths from stdin (one per line) until QUIT/EOF, reusing this Blender process."""
+    _stage_log("worker", "ready")
+    for line in sys.stdin:
+        job_path = line.strip()
+        if not job_path:
+            continue
+        if job_path == "QUIT":
+            break
+        # Same clean state a fresh --factory-startup process would have.
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        try:
+            main(job_path)
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+            print(f"{_WORKER_DONE_TAG} error", flush=True)
+        else:
+            print(f"{_WORKER_DONE_TAG} ok", flush=True)
+    _stage_log("worker", "exit")
+
+
 if __name__ == "__main__":
     _stage_log("startup", "blender_script module entry")
-    main()
+    script_args = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    if "--worker" in script_args:
+        _worker_loop()
+    else:
+        main()
@@ -7,11 +7,14 @@ Colors are set as "hints" via ColorGroup when supported.
 
 from __future__ import annotations
 
+import ctypes
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 import lib3mf
+import numpy as np
 import trimesh
 
 logger = logging.getLogger(__name__)
@@ -21,6 +24,9 @@ class Export3MFError(Exception):
     """Raised when 3MF export fails."""
 
 
+# Object order in the 3MF (stable, nice for slicers)
+_OBJECT_ORDER = ("base", "water", "green", "detail", "track", "frame")
+
 # Color palette from SPEC.md (RGB 0-255)
 _OBJECT_COLORS = {
     "base": (120, 80, 50),        # brown
@@ -32,10 +38,170 @@ _OBJECT_COLORS = {
 }
 
 
-def _rgb_to_srgb_int(r: int, g: int, b: int, a: int = 255) -> int:
-    """Convert RGBA (0-255) to lib3mf sRGB uint32 (A B G R)."""
-    # lib3mf expects sRGB packed as 0xAABBGGRR
-    return ((a & 0xFF) << 24) | ((b & 0xFF) << 16) | ((g & 0xFF) << 8) | (r & 0xFF)
+def _set_mesh_geometry(mesh_obj: "lib3mf.MeshObject", vertices: np.ndarray, faces: np.ndarray) -> None:
+    """Set all vertices and triangles of a lib3mf mesh object in a single call.
+
+    lib3mf's Position/Triangle structs are 3 packed float32/uint32, so the NumPy
+    buffers are passed to the C API as-is. ``MeshObject.SetGeometry`` would rebuild
+    them element by element in Python.
+    """
+    v = np.array(vertices, dtype=np.float32, order="C")
+    f = np.array(faces, dtype=np.uint32, order="C")
+    positions = (lib3mf.Position * len(v)).from_buffer(v)
+    triangles = (lib3mf.Triangle * len(f)).from_buffer(f)
+    wrapper = mesh_obj._wrapper
+    wrapper.checkError(
+        mesh_obj,
+        wrapper.lib.lib3mf_meshobject_setgeometry(
+            mesh_obj._handle, ctypes.c_uint64(len(v)), positions, ctypes.c_uint64(len(f)), triangles
+        ),
+    )
+
+
+def _load_stl_mesh(stl_path: Path) -> Optional[trimesh.Trimesh]:
+    """Load an STL as one triangle mesh; None if it has no geometry."""
+    mesh = trimesh.load_mesh(str(stl_path))
+
+    # If trimesh returns a Scene, merge geometries
+    if isinstance(mesh, trimesh.Scene):
+        if not mesh.geometry:
+            return None
+        mesh = trimesh.util.concatenate(tuple(mesh.geometry.values()))
+
+    # Ensure we have a Trimesh
+    if not isinstance(mesh, trimesh.Trimesh):
+        mesh = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces, process=False)
+
+    # Basic empty checks
+    if getattr(mesh, "faces", None) is None or mesh.faces.size == 0 or mesh.vertices.size == 0:
+        return None
+
+    # Make sure faces are triangles
+    if mesh.faces.shape[1] != 3:
+        mesh = mesh.triangulate()
+    return mesh
+
+
+def _has_stl_reader(model: "lib3mf.Model") -> bool:
+    try:
+        model.QueryReader("stl")
+    except Exception:  # noqa: BLE001 - older/limited lib3mf builds
+        return False
+    return True
+
+
+def _read_stl_into_model(model: "lib3mf.Model", stl_path: Path) -> list["lib3mf.MeshObject"]:
+    """Read an STL with lib3mf's own (C++) reader; return the non-empty mesh objects it added.
+
+    The reader merges duplicate vertices and appends each mesh plus an identity build
+    item to ``model``, so no vertex/triangle data goes through Python.
+    """
+
+    def mesh_objects() -> dict[int, "lib3mf.MeshObject"]:
+        found = {}
+        it = model.GetMeshObjects()
+        while it.MoveNext():
+            obj = it.GetCurrentMeshObject()
+            found[obj.GetResourceID()] = obj
+        return found
+
+    before = mesh_objects().keys()
+    model.QueryReader("stl").ReadFromFile(str(stl_path))
+    added = [obj for res_id, obj in mesh_objects().items() if res_id not in before]
+
+    empty_ids = {obj.GetResourceID() for obj in added if obj.GetTriangleCount() == 0}
+    if empty_ids:
+        items = model.GetBuildItems()
+        stale = []
+        while items.MoveNext():
+            item = items.GetCurrent()
+            if item.GetObjectResourceID() in empty_ids:
+                stale.append(item)
+        for item in stale:
+            model.RemoveBuildItem(item)
+        for obj in added:
+            if obj.GetResourceID() in empty_ids:
+                model.RemoveResource(obj)
+    return [obj for obj in added if obj.GetResourceID() not in empty_ids]
+
+
+def _add_color_palette(wrapper: "lib3mf.Wrapper", model: "lib3mf.Model") -> tuple[int, dict[str, int]]:
+    """Add one ColorGroup holding every object color; return (group resource id, name -> property id)."""
+    palette = model.AddColorGroup()
+    property_ids = {
+        name: palette.AddColor(wrapper.RGBAToColor(r, g, b, 255)) for name, (r, g, b) in _OBJECT_COLORS.items()
+    }
+    return palette.GetUniqueResourceID(), property_ids
+
+
+def _write_3mf(model: "lib3mf.Model", output_3mf_path: Path, added_objects: list[str]) -> None:
+    try:
+        writer = model.QueryWriter("3mf")
+        writer.WriteToFile(str(output_3mf_path))
+    except Exception as exc:
+        raise Export3MFError(f"Failed to write 3MF file: {exc}") from exc
+
+    logger.info("Exported 3MF with objects: %s", ", ".join(added_objects))
+    logger.info("Output file: %s", output_3mf_path)
+
+
+def export_meshes_to_3mf(
+    meshes: dict[str, tuple[np.ndarray, np.ndarray]],
+    output_3mf_path: Path,
+) -> Path:
+    """
+    Pack in-memory meshes into a single 3MF, like export_stls_to_3mf but without
+    writing and re-reading STL files.
+
+    Args:
+        meshes: Dict mapping object names (base, water, green, detail, track, frame)
+                to (vertices Nx3, faces Mx3) arrays. Missing or empty parts are skipped.
+        output_3mf_path: Output 3MF file path.
+
+    Returns:
+        Path to the generated 3MF file.
+
+    Raises:
+        Export3MFError: If no part has geometry or 3MF creation fails.
+    """
+    output_3mf_path = Path(output_3mf_path)
+    output_3mf_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        wrapper = lib3mf.Wrapper()
+        model = wrapper.CreateModel()
+        identity_transform = wrapper.GetIdentityTransform()
+        palette_id, palette_ids = _add_color_palette(wrapper, model)
+
+        added_objects: list[str] = []
+        for obj_name in _OBJECT_ORDER:
+            if obj_name not in meshes:
+                continue
+            vertices, faces = meshes[obj_name]
+            if len(vertices) == 0 or len(faces) == 0:
+                logger.warning("Empty mesh for %s", obj_name)
+                continue
+
+            mesh_obj = model.AddMeshObject()
+            mesh_obj.SetName(obj_name)
+            _set_mesh_geometry(mesh_obj, vertices, faces)
+            model.AddBuildItem(mesh_obj, identity_transform)
+            if obj_name in palette_ids:
+                mesh_obj.SetObjectLevelProperty(palette_id, palette_ids[obj_name])
+
+            added_objects.append(obj_name)
+            logger.info("Added object '%s' from memory", obj_name)
+
+        if not added_objects:
+            raise Export3MFError("No meshes with geometry were given; 3MF would be empty.")
+
+        _write_3mf(model, output_3mf_path, added_objects)
+        return output_3mf_path
+
+    except Export3MFError:
+        raise
+    except Exception as exc:
+        raise Export3MFError(f"Unexpected error during 3MF export: {exc}") from exc
 
 
 def export_stls_to_3mf(
@@ -63,11 +229,14 @@ def export_stls_to_3mf(
         wrapper = lib3mf.Wrapper()
         model = wrapper.CreateModel()
         identity_transform = wrapper.GetIdentityTransform()
+        # Suggested colors (hints): one shared group, referenced by property id per object.
+        palette_id, palette_ids = _add_color_palette(wrapper, model)
 
         added_objects: list[str] = []
 
         # Iterate in a stable order (nice for slicers)
-        for obj_name in ["base", "water", "green", "detail", "track", "frame"]:
+        pending: list[tuple[str, Path]] = []
+        for obj_name in _OBJECT_ORDER:
             if obj_name not in stl_paths:
                 continue
 
@@ -75,78 +244,61 @@ def export_stls_to_3mf(
             if not stl_path.exists():
                 logger.warning("STL not found, skipping %s: %s", obj_name, stl_path)
                 continue
+            pending.append((obj_name, stl_path))
+
+        if _has_stl_reader(model):
+            for obj_name, stl_path in pending:
+                try:
+                    mesh_objs = _read_stl_into_model(model, stl_path)
+                    if not mesh_objs:
+                        logger.warning("Empty mesh for %s: %s", obj_name, stl_path)
+                        continue
+                    for mesh_obj in mesh_objs:
+                        mesh_obj.SetName(obj_name)
+                        if obj_name in palette_ids:
+                            mesh_obj.SetObjectLevelProperty(palette_id, palette_ids[obj_name])
 
-            try:
-                mesh = trimesh.load_mesh(str(stl_path))
+                    added_objects.append(obj_name)
+                    logger.info("Added object '%s' from %s", obj_name, stl_path.name)
 
-                # If trimesh returns a Scene, merge geometries
-                if isinstance(mesh, trimesh.Scene):
-                    if not mesh.geometry:
-                        logger.warning("Empty scene for %s: %s", obj_name, stl_path)
-                        continue
-                    mesh = trimesh.util.concatenate(tuple(mesh.geometry.values()))
-
-                # Ensure we have a Trimesh
-                if not isinstance(mesh, trimesh.Trimesh):
-                    mesh = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces, process=False)
-
-                # Basic empty checks
-                if getattr(mesh, "faces", None) is None or mesh.faces.size == 0 or mesh.vertices.size == 0:
-                    logger.warning("Empty mesh for %s: %s", obj_name, stl_path)
-                    continue
-
-                # Make sure faces are triangles
-                if mesh.faces.shape[1] != 3:
-                    mesh = mesh.triangulate()
-
-                # Create mesh object in lib3mf
-                mesh_obj = model.AddMeshObject()
-                mesh_obj.SetName(obj_name)
-
-                # Add vertices
-                vertices = mesh.vertices.astype("float32")
-                for vx, vy, vz in vertices:
-                    mesh_obj.AddVertex(float(vx), float(vy), float(vz))
-
-                # Add triangles
-                faces = mesh.faces.astype("uint32")
-                for f0, f1, f2 in faces:
-                    tri = lib3mf.TRIANGLE()
-                    tri.m_nIndices[0] = int(f0)
-                    tri.m_nIndices[1] = int(f1)
-                    tri.m_nIndices[2] = int(f2)
-                    mesh_obj.AddTriangle(tri)
-
-                # Add to build with identity transform
-                model.AddBuildItem(mesh_obj, identity_transform)
-
-                # Assign suggested color (hint)
-                if obj_name in _OBJECT_COLORS:
-                    r, g, b = _OBJECT_COLORS[obj_name]
-                    color_int = _rgb_to_srgb_int(r, g, b, 255)
-                    color_group = model.AddColorGroup()
-                    color_group.AddColor(color_int)
-                    # Object-level property index 0 in that color group
-                    mesh_obj.SetObjectLevelProperty(color_group, 0)
-
-                added_objects.append(obj_name)
-                logger.info("Added object '%s' from %s", obj_name, stl_path.name)
-
-            except Exception as exc:
-                raise Export3MFError(f"Failed to load STL '{stl_path}': {exc}") from exc
+                except Exception as exc:
+                    raise Export3MFError(f"Failed to load STL '{stl_path}': {exc}") from exc
+        else:
+            # Read/parse the STLs concurrently; lib3mf is only touched from this thread, in order.
+            with ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix="maps3d-3mf") as pool:
+                loads = [(obj_name, stl_path, pool.submit(_load_stl_mesh, stl_path)) for obj_name, stl_path in pending]
+
+                for obj_name, stl_path, load in loads:
+                    try:
+                        mesh = load.result()
+                        if mesh is None:
+                            logger.warning("Empty mesh for %s: %s", obj_name, stl_path)
+                            continue
+
+                        # Create mesh object in lib3mf
+                        mesh_obj = model.AddMeshObject()
+                        mesh_obj.SetName(obj_name)
+
+                        # Add vertices and triangles in one bulk call
+                        _set_mesh_geometry(mesh_obj, mesh.vertices, mesh.faces)
+
+                        # Add to build with identity transform
+                        model.AddBuildItem(mesh_obj, identity_transform)
+
+                        # Assign suggested color (hint)
+                        if obj_name in palette_ids:
+                            mesh_obj.SetObjectLevelProperty(palette_id, palette_ids[obj_name])
+
+                        added_objects.append(obj_name)
+                        logger.info("Added object '%s' from %s", obj_name, stl_path.name)
+
+                    except Exception as exc:
+                        raise Export3MFError(f"Failed to load STL '{stl_path}': {exc}") from exc
 
         if not added_objects:
             raise Export3MFError("No valid STL files were loaded; 3MF would be empty.")
 
-        # Save 3MF
-        try:
-            writer = model.QueryWriter("3mf")
-            writer.WriteToFile(str(output_3mf_path))
-        except Exception as exc:
-            raise Export3MFError(f"Failed to write 3MF file: {exc}") from exc
-
-        logger.info("Exported 3MF with objects: %s", ", ".join(added_objects))
-        logger.info("Output file: %s", output_3mf_path)
+        _write_3mf(model, output_3mf_path, added_objects)
         return output_3mf_path
 
     except Export3MFError:
@@ -201,3 +353,20 @@ def create_3mf_from_stl_output_base(
 
     output_3mf_path = parent / f"{stem}{suffix}.3mf"
     return export_stls_to_3mf(stl_paths, output_3mf_path)
+
+
+def create_3mf_from_meshes(
+    output_base: Path,
+    meshes: dict[str, tuple[np.ndarray, np.ndarray]],
+    test_mode: bool = False,
+) -> Path:
+    """
+    Like create_3mf_from_stl_output_base, for parts still in memory (Python backend).
+
+    Output 3MF:
+    - Normal: {stem}.3mf
+    - Test:   {stem}_test.3mf
+    """
+    output_base = Path(output_base)
+    suffix = "_test" if test_mode else ""
+    return export_meshes_to_3mf(meshes, output_base.parent / f"{output_base.stem}{suffix}.3mf")
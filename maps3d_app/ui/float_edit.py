@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from PySide6.QtCore import QLocale
+from PySide6.QtGui import QDoubleValidator, QFocusEvent
+from PySide6.QtWidgets import QLineEdit, QWidget
+
+
+class FloatEdit(QLineEdit):
+    """QLineEdit for a float parameter: validated input, parsed value kept in ``value``.
+
+    ``value`` follows every acceptable edit (typed or set with setText), so readers
+    don't parse the text. Leaving the field with incomplete input restores the last value.
+    """
+
+    # One validator shared by every field (validators hold no per-widget state).
+    _validator: QDoubleValidator | None = None
+
+    def __init__(self, text: str, parent: QWidget | None = None) -> None:
+        super().__init__(text, parent)
+        self.setValidator(self._shared_validator())
+        self.value = float(text)
+        self._value_text = text
+        self.textChanged.connect(self._on_text_changed)
+
+    @classmethod
+    def _shared_validator(cls) -> QDoubleValidator:
+        if cls._validator is None:
+            validator = QDoubleValidator()
+            # "." as decimal separator whatever the system locale (the defaults use it), and no
+            # group separators: "1,000" must not pass as acceptable input that float() rejects.
+            locale = QLocale.c()
+            locale.setNumberOptions(QLocale.NumberOption.RejectGroupSeparator)
+            validator.setLocale(locale)
+            validator.setNotation(QDoubleValidator.Notation.StandardNotation)
+            cls._validator = validator
+        return cls._validator
+
+    def _on_text_changed(self, text: str) -> None:
+        if self.hasAcceptableInput():
+            self.value = float(text)
+            self._value_text = text
+
+    def focusOutEvent(self, event: QFocusEvent) -> None:
+        if not self.hasAcceptableInput():
+            self.setText(self._value_text)
+        super().focusOutEvent(event)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from PySide6.QtWidgets import QFormLayout, QGroupBox, QVBoxLayout, QWidget
+
+
+class LazyGroup(QGroupBox):
+    """Collapsible QGroupBox whose form is built the first time it is expanded.
+
+    The title check box expands/collapses the section. ``build`` receives the form layout
+    to fill; until then the section's widgets are not laid out, polished or painted.
+    """
+
+    def __init__(self, title: str, build: Callable[[QFormLayout], None], parent: QWidget | None = None) -> None:
+        super().__init__(title, parent)
+        self._build = build
+        self._content: QWidget | None = None
+        QVBoxLayout(self).setContentsMargins(0, 0, 0, 0)
+        self.setCheckable(True)
+        self.setChecked(False)
+        self.toggled.connect(self._on_toggled)
+
+    def _on_toggled(self, expanded: bool) -> None:
+        if self._content is None:
+            if not expanded:
+                return
+            self._content = QWidget(self)
+            self._build(QFormLayout(self._content))
+            self.layout().addWidget(self._content)
+        self._content.setVisible(expanded)
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+from collections import deque
+from functools import lru_cache, partial
+import inspect
+import os
 from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING
 
-from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtCore import QSettings, Qt, QThread, QTimer, Signal
+from PySide6.QtGui import QCloseEvent
 from PySide6.QtWidgets import (
     QCheckBox,
     QComboBox,
@@ -22,27 +29,141 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from ..core.dem_downloader import download_srtm_dem_for_bbox
-from ..core.pipeline import (
-    GenerateConfig,
-    compute_gpx_bbox_lonlat,
-    default_dem_output_path_for_gpx,
-    estimate_relief_mm,
-    run_pipeline,
+from .float_edit import FloatEdit
+from .lazy_group import LazyGroup
+
+# The core pipeline (rasterio, pyproj, trimesh, shapely) and the OpenGL preview are
+# imported where first used, so the window paints without loading them.
+if TYPE_CHECKING:
+    from ..core.pipeline import GenerateConfig
+    from .preview3d import Preview3DWidget
+
+QUALITY_TO_GRID = MappingProxyType({"fast": 200, "high": 400, "ultra": 700})
+PRINTER_PROFILE_TO_VALUES = MappingProxyType({"bambu": (0.22, 0.9), "voron": (0.28, 1.0)})
+SETTINGS_KEY = ("maps3d", "app")
+# Worker signals are emitted on worker threads; their slots always run on the GUI thread.
+_QUEUED = Qt.ConnectionType.QueuedConnection
+_LOG_MAX_LINES = 5000
+_LOG_FLUSH_MS = 100
+_RELIEF_DEBOUNCE_MS = 200
+# Frame compass labels: (letter shown in the form, GenerateConfig field).
+_COMPASS_LABEL_FIELDS = (("N", "label_n"), ("S", "label_s"), ("E", "label_e"), ("O", "label_w"))
+# Preview parts: (file suffix, RGBA, name, layer), drawn in this order. Layers other than
+# "base" follow a visibility checkbox (see _preview_layer_switches).
+_PREVIEW_LAYERS = (
+    ("base_brown.stl", (0.47, 0.31, 0.18, 1.0), "base", "base"),
+    ("water.stl", (0.2, 0.45, 0.95, 0.95), "water", "ams"),
+    ("green.stl", (0.18, 0.70, 0.25, 0.95), "green", "ams"),
+    ("detail.stl", (0.9, 0.87, 0.78, 0.95), "detail", "ams"),
+    ("track_inlay_red.stl", (0.9, 0.1, 0.1, 1.0), "track", "track"),
+    ("frame.stl", (0.6, 0.6, 0.62, 0.9), "frame", "frame"),
 )
-from .preview3d import Preview3DWidget
 
-QUALITY_TO_GRID = {"fast": 200, "high": 400, "ultra": 700}
-PRINTER_PROFILE_TO_VALUES = {"bambu": (0.22, 0.9), "voron": (0.28, 1.0)}
 
-
-class Worker(QObject):
-    finished = Signal(object)
+def _find_blender_exe() -> str | None:
+    """Scan the usual Windows install locations for blender.exe (newest versioned folder wins)."""
+    import glob
+
+    direct_paths = [
+        r"C:\Program Files\Blender Foundation\Blender\blender.exe",
+        r"C:\Program Files (x86)\Blender Foundation\Blender\blender.exe",
+    ]
+    wildcard_patterns = [
+        r"C:\Program Files\Blender Foundation\Blender*\blender.exe",
+        r"C:\Program Files (x86)\Blender Foundation\Blender*\blender.exe",
+    ]
+
+    localappdata = os.environ.get("LOCALAPPDATA")
+    if localappdata:
+        wildcard_patterns.append(rf"{localappdata}\Programs\Blender Foundation\Blender*\blender.exe")
+
+    for p in direct_paths:
+        if Path(p).exists():
+            return p
+
+    for pat in wildcard_patterns:
+        matches = glob.glob(pat)
+        if matches:
+            return sorted(matches)[-1]
+    return None
+
+
+def _prewarm_core(log) -> None:
+    """Worker task: import the generation modules ahead of use. Failures surface later, at use."""
+    try:
+        import rasterio
+
+        from ..core import pipeline  # noqa: F401
+
+        with rasterio.Env():  # registers the GDAL drivers
+            pass
+    except Exception:  # noqa: BLE001
+        pass
+
+
+def _parse_preview_part(log, batch: int, path: Path, color, name: str, layer: str):
+    """Worker task: parse one preview STL; errors are returned (with the part) rather than raised."""
+    # Not via preview3d: parsing needs neither pyqtgraph nor a GL context.
+    from .stl_mesh import decimate_for_preview, mesh_bounds, read_stl_mesh, vertex_normals
+
+    try:
+        vertices, faces = read_stl_mesh(path)
+        bounds = mesh_bounds(vertices)  # of the full mesh: framing stays exact
+        vertices, faces = decimate_for_preview(vertices, faces)
+        mesh = (vertices, faces, bounds, vertex_normals(vertices, faces))
+        return batch, name, color, layer, mesh, None
+    except Exception as exc:  # noqa: BLE001
+        return batch, name, color, layer, None, str(exc)
+
+
+@lru_cache(maxsize=8)
+def _preview_part_paths(
+    base_out: Path, test_mode: bool, separate_frame: bool
+) -> tuple[tuple[Path, tuple[float, float, float, float], str, str], ...]:
+    """(path, color, name, layer) of every part a generation writes next to ``base_out``."""
+    # Every part is loaded; the checkboxes only show/hide layers in the preview.
+    prefix = f"{base_out.stem}_test_" if test_mode else f"{base_out.stem}_"
+    parent = base_out.parent
+    return tuple(
+        (parent / f"{prefix}{suffix}", color, name, layer)
+        for suffix, color, name, layer in _PREVIEW_LAYERS
+        if layer != "frame" or separate_frame
+    )
+
+
+def _estimate_relief_task(log, serial: int, gpx: str, dem: str, config: GenerateConfig, release_dems: bool):
+    """Worker task: relief estimate for the label; None when the inputs can't be read yet.
+
+    ``release_dems`` (the DEM path changed) first closes the cached DEM datasets, so the
+    previous file isn't held open for the rest of the session.
+    """
+    from ..core.dem_io import close_all
+    from ..core.pipeline import estimate_relief_mm
+
+    if release_dems:
+        close_all()
+    try:
+        return serial, estimate_relief_mm(gpx, dem, config)
+    except Exception:  # noqa: BLE001
+        return serial, None
+
+
+class Worker(QThread):
+    """Background task on a QThread of its own, started by MainWindow._start_worker.
+
+    Not QThreadPool: pyproj (via rasterio too) crashes when driven from pool threads.
+    """
+
+    done = Signal(object)
     failed = Signal(str)
     log = Signal(str)  # log live verso UI
+    progress = Signal(int, str)  # (percentuale, fase)
 
     def __init__(self, fn, *args, **kwargs) -> None:
         super().__init__()
+        # Tasks declaring a ``log`` parameter get the live log callback as first argument.
+        if "log" in inspect.signature(fn).parameters:
+            args = (self.log.emit, *args)
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
@@ -50,11 +171,8 @@ class Worker(QObject):
     def run(self) -> None:
         try:
             self.log.emit("[worker] start")  # DEBUG
-            try:
-                out = self.fn(self.log.emit, *self.args, **self.kwargs)
-            except TypeError:
-                out = self.fn(*self.args, **self.kwargs)
-            self.finished.emit(out)
+            out = self.fn(*self.args, **self.kwargs)
+            self.done.emit(out)
         except Exception as exc:  # noqa: BLE001
             self.failed.emit(str(exc))
 
@@ -70,9 +188,33 @@ class MainWindow(QMainWindow):
         self.setMinimumSize(1280, 820)
         self.setMinimumWidth(760)
 
-        self._thread: QThread | None = None
-        self._worker: Worker | None = None
+        self._log_buf: deque[str] = deque(maxlen=_LOG_MAX_LINES)
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(_LOG_FLUSH_MS)
+        self._log_timer.timeout.connect(self._flush_log)
+        # Progress ticks are applied at most once per _LOG_FLUSH_MS as well.
+        self._pending_progress: int | None = None
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setSingleShot(True)
+        self._progress_timer.setInterval(_LOG_FLUSH_MS)
+        self._progress_timer.timeout.connect(self._flush_progress)
+
+        # Every Worker is a QThread, referenced here until the thread has ended (closeEvent waits
+        # for them). Long jobs of different kinds (download, generation) run side by side.
+        self._threads: set[Worker] = set()
+
+        # Running long jobs by kind: (worker, on_done); waiting ones: (fn, on_done, with_progress).
+        self._jobs: dict[str, tuple[Worker, object]] = {}
+        self._pending_jobs: dict[str, tuple[object, object, bool]] = {}
+        # Kind whose percentages drive self.progress; other jobs only keep it busy when it's idle.
+        self._progress_job: str | None = None
+        self._detect_worker: Worker | None = None
+        self._preview_batch = 0
+        self._preview_workers: dict[tuple[int, str], Worker] = {}
         self._last_output_base: Path | None = None
+        # (test_mode, separate_frame) of the last generation: they decide which parts it wrote.
+        self._last_output_layout = (False, False)
 
         # Input path widgets
         self.gpx_path = QLineEdit()
@@ -111,6 +253,21 @@ class MainWindow(QMainWindow):
         self.export_3mf = QCheckBox("Genera anche 3MF (Bambu)")
         self.export_3mf.setChecked(True)
 
+        # Opt-in: one Blender process kept alive for all generations (no per-job log file or timeout).
+        self.reuse_blender = QCheckBox("Riusa processo Blender tra le generazioni")
+        self.reuse_blender.setChecked(
+            QSettings(*SETTINGS_KEY).value("reuse_blender_process", False, type=bool)
+        )
+        self.reuse_blender.toggled.connect(
+            lambda checked: QSettings(*SETTINGS_KEY).setValue("reuse_blender_process", checked)
+        )
+        # Opt-in: run the Blender script through a pip-installed bpy module (ignored without it).
+        self.inprocess_bpy = QCheckBox("Usa il modulo bpy in-process (se installato)")
+        self.inprocess_bpy.setChecked(QSettings(*SETTINGS_KEY).value("use_inprocess_bpy", False, type=bool))
+        self.inprocess_bpy.toggled.connect(
+            lambda checked: QSettings(*SETTINGS_KEY).setValue("use_inprocess_bpy", checked)
+        )
+
         # Frame options
         self.separate_frame = QCheckBox()
         self.separate_frame.setChecked(True)
@@ -137,41 +294,39 @@ class MainWindow(QMainWindow):
         # Text labels
         self.title_text = QLineEdit("")
         self.subtitle_text = QLineEdit("")
-        self.label_n = QLineEdit("N")
-        self.label_s = QLineEdit("S")
-        self.label_e = QLineEdit("E")
-        self.label_w = QLineEdit("O")
+        # Compass labels by shown letter; an empty field falls back to the letter.
+        self.compass_labels = {letter: QLineEdit(letter) for letter, _ in _COMPASS_LABEL_FIELDS}
 
         # Dimension and sizing parameters (FIXED 120x120)
-        self.size_x = QLineEdit("120")
-        self.size_y = QLineEdit("120")
-        self.base_mm = QLineEdit("5")
-        self.vertical_scale = QLineEdit("1.0")
-        self.track_height = QLineEdit("2")
+        self.size_x = FloatEdit("120")
+        self.size_y = FloatEdit("120")
+        self.base_mm = FloatEdit("5")
+        self.vertical_scale = FloatEdit("1.0")
+        self.track_height = FloatEdit("2")
 
         # Frame parameters
-        self.frame_wall_mm = QLineEdit("10")
-        self.frame_height_mm = QLineEdit("8")
-        self.lip_depth_mm = QLineEdit("3")
-        self.clearance_mm = QLineEdit("0.3")
-        self.recess_mm = QLineEdit("1.5")
-        self.lead_in_mm = QLineEdit("1.0")
-        self.finger_notch_radius_mm = QLineEdit("7.0")
-        self.rim_mm = QLineEdit("3.0")
+        self.frame_wall_mm = FloatEdit("10")
+        self.frame_height_mm = FloatEdit("8")
+        self.lip_depth_mm = FloatEdit("3")
+        self.clearance_mm = FloatEdit("0.3")
+        self.recess_mm = FloatEdit("1.5")
+        self.lead_in_mm = FloatEdit("1.0")
+        self.finger_notch_radius_mm = FloatEdit("7.0")
+        self.rim_mm = FloatEdit("3.0")
 
         # Groove and track parameters
-        self.groove_width_mm = QLineEdit("2.6")
-        self.groove_depth_mm = QLineEdit("1.6")
-        self.groove_chamfer_mm = QLineEdit("0.4")
-        self.track_clearance_mm = QLineEdit("0.20")
-        self.track_relief_mm = QLineEdit("0.6")
-        self.track_top_radius_mm = QLineEdit("0.8")
+        self.groove_width_mm = FloatEdit("2.6")
+        self.groove_depth_mm = FloatEdit("1.6")
+        self.groove_chamfer_mm = FloatEdit("0.4")
+        self.track_clearance_mm = FloatEdit("0.20")
+        self.track_relief_mm = FloatEdit("0.6")
+        self.track_top_radius_mm = FloatEdit("0.8")
 
         # Text rendering options
         self.text_mode = QComboBox()
         self.text_mode.addItem("Inciso", userData="inciso")
         self.text_mode.addItem("Rilievo", userData="rilievo")
-        self.text_depth_mm = QLineEdit("1.2")
+        self.text_depth_mm = FloatEdit("1.2")
 
         # Test mode
         self.test_mode = QCheckBox()
@@ -186,6 +341,8 @@ class MainWindow(QMainWindow):
 
         self.preview_btn = QPushButton("Carica anteprima 3D")
         self.preview_btn.clicked.connect(self._load_preview_from_outputs)
+        for layer, switch in self._preview_layer_switches().items():
+            switch.toggled.connect(partial(self._on_preview_layer_toggled, layer))
 
         self.generate_btn = QPushButton("Genera")
         self.generate_btn.setMinimumHeight(48)
@@ -202,7 +359,37 @@ class MainWindow(QMainWindow):
         # Log and preview widgets
         self.log = QPlainTextEdit()
         self.log.setReadOnly(True)
-        self.preview = Preview3DWidget()
+        self.log.setMaximumBlockCount(_LOG_MAX_LINES)
+        # Appends only: no undo history kept for them.
+        self.log.setUndoRedoEnabled(False)
+        # The 3D preview is created on first use (see _ensure_preview) inside this slot.
+        self.preview: Preview3DWidget | None = None
+        self._preview_slot = QWidget()
+        QVBoxLayout(self._preview_slot).setContentsMargins(0, 0, 0, 0)
+
+        # Last GenerateConfig; rebuilt only after an input widget changes.
+        self._config_cache: GenerateConfig | None = None
+        for widget in (*vars(self).values(), *self.compass_labels.values()):
+            if isinstance(widget, QLineEdit):
+                widget.textChanged.connect(self._invalidate_config)
+            elif isinstance(widget, QCheckBox):
+                widget.toggled.connect(self._invalidate_config)
+            elif isinstance(widget, QComboBox):
+                widget.currentIndexChanged.connect(self._invalidate_config)
+
+        # The relief label follows its inputs: re-estimated off the GUI thread once typing pauses.
+        self._relief_timer = QTimer(self)
+        self._relief_timer.setSingleShot(True)
+        self._relief_timer.setInterval(_RELIEF_DEBOUNCE_MS)
+        self._relief_timer.timeout.connect(self._estimate_relief_async)
+        self._relief_serial = 0
+        # DEM path of the last estimate: a change releases the cached handles of the old file.
+        self._relief_dem = ""
+        # Estimate for the current inputs, once the background job reports it.
+        self._last_relief_mm: float | None = None
+        self._relief_workers: dict[int, Worker] = {}
+        for widget in (self.gpx_path, self.dem_path, self.size_x, self.size_y, self.vertical_scale):
+            widget.textChanged.connect(self._schedule_relief_estimate)
 
         self._build_ui()
         self._apply_printer_profile_defaults()
@@ -210,17 +397,37 @@ class MainWindow(QMainWindow):
 
         self._append_log(f"[BUILD] {self._build_stamp}")
 
+        # Load the core stack (rasterio/GDAL, pyproj, trimesh, shapely) while the user fills
+        # in the form, so the first Genera click doesn't pay for the imports.
+        self._start_worker(Worker(_prewarm_core))
+
     def _build_ui(self) -> None:
         root = QWidget()
         self.setCentralWidget(root)
 
         layout = QHBoxLayout(root)
 
-        left = self._build_controls_column()
-        right = self._build_preview_column()
-
-        layout.addWidget(left, 4)
-        layout.addWidget(right, 6)
+        # Populate both columns with repaints off, then lay out/paint once.
+        self.setUpdatesEnabled(False)
+        try:
+            left = self._build_controls_column()
+            right = self._build_preview_column()
+
+            layout.addWidget(left, 4)
+            layout.addWidget(right, 6)
+        finally:
+            self.setUpdatesEnabled(True)
+            self.update()
+
+    @staticmethod
+    def _file_row(edit: QLineEdit, button_text: str, on_browse) -> QHBoxLayout:
+        """Path field followed by its browse button."""
+        row = QHBoxLayout()
+        row.addWidget(edit)
+        button = QPushButton(button_text)
+        button.clicked.connect(on_browse)
+        row.addWidget(button)
+        return row
 
     def _build_controls_column(self) -> QWidget:
         container = QWidget()
@@ -229,29 +436,10 @@ class MainWindow(QMainWindow):
         files = QGroupBox("Input")
         f = QFormLayout(files)
 
-        gpx_row = QHBoxLayout()
-        gpx_row.addWidget(self.gpx_path)
-        gpx_btn = QPushButton("Apri GPX")
-        gpx_btn.clicked.connect(self._select_gpx)
-        gpx_row.addWidget(gpx_btn)
-
-        dem_row = QHBoxLayout()
-        dem_row.addWidget(self.dem_path)
-        dem_btn = QPushButton("Apri DEM (GeoTIFF)")
-        dem_btn.clicked.connect(self._select_dem)
-        dem_row.addWidget(dem_btn)
-
-        blender_row = QHBoxLayout()
-        blender_row.addWidget(self.blender_exe_path)
-        blender_btn = QPushButton("Sfoglia")
-        blender_btn.clicked.connect(self._select_blender_exe)
-        blender_row.addWidget(blender_btn)
-
-        out_row = QHBoxLayout()
-        out_row.addWidget(self.out_dir)
-        out_btn = QPushButton("Sfoglia")
-        out_btn.clicked.connect(self._select_out_dir)
-        out_row.addWidget(out_btn)
+        gpx_row = self._file_row(self.gpx_path, "Apri GPX", self._select_gpx)
+        dem_row = self._file_row(self.dem_path, "Apri DEM (GeoTIFF)", self._select_dem)
+        blender_row = self._file_row(self.blender_exe_path, "Sfoglia", self._select_blender_exe)
+        out_row = self._file_row(self.out_dir, "Sfoglia", self._select_out_dir)
 
         f.addRow("GPX:", gpx_row)
         f.addRow("DEM:", dem_row)
@@ -263,6 +451,8 @@ class MainWindow(QMainWindow):
         f.addRow("Stampante:", self.printer_profile)
         f.addRow("", self.export_3mf)
         f.addRow("Blender.exe:", blender_row)
+        f.addRow("", self.reuse_blender)
+        f.addRow("", self.inprocess_bpy)
         l.addWidget(files)
 
         params = QGroupBox("Parametri")
@@ -275,46 +465,43 @@ class MainWindow(QMainWindow):
         p.addRow("Rilievo stimato:", self.relief_estimate)
         l.addWidget(params)
 
-        frame = QGroupBox("Cornice / Incastro")
-        fr = QFormLayout(frame)
-        fr.addRow("Cornice separata:", self.separate_frame)
-        fr.addRow("Modalità:", self.flush_mode)
-        fr.addRow("Testi cornice:", self.frame_text_enabled)
-        fr.addRow("frame_wall_mm:", self.frame_wall_mm)
-        fr.addRow("frame_height_mm:", self.frame_height_mm)
-        fr.addRow("lip_depth_mm:", self.lip_depth_mm)
-        fr.addRow("clearance_mm:", self.clearance_mm)
-        fr.addRow("recess_mm:", self.recess_mm)
-        fr.addRow("lead_in_mm:", self.lead_in_mm)
-        fr.addRow("finger_notch_radius_mm:", self.finger_notch_radius_mm)
-        fr.addRow("rim_mm:", self.rim_mm)
-        fr.addRow("Test incastro:", self.test_mode)
-        fr.addRow("", self.test_mode_info)
-        l.addWidget(frame)
-
-        ams = QGroupBox("AMS + Traccia")
-        a = QFormLayout(ams)
-        a.addRow("AMS 4 colori:", self.ams_enabled)
-        a.addRow("Traccia inlay:", self.track_inlay_enabled)
-        a.addRow("groove_width_mm:", self.groove_width_mm)
-        a.addRow("groove_depth_mm:", self.groove_depth_mm)
-        a.addRow("groove_chamfer_mm:", self.groove_chamfer_mm)
-        a.addRow("track_clearance_mm:", self.track_clearance_mm)
-        a.addRow("track_relief_mm:", self.track_relief_mm)
-        a.addRow("track_top_radius_mm:", self.track_top_radius_mm)
-        l.addWidget(ams)
-
-        text = QGroupBox("Testi")
-        t = QFormLayout(text)
-        t.addRow("Titolo:", self.title_text)
-        t.addRow("Sottotitolo:", self.subtitle_text)
-        t.addRow("N:", self.label_n)
-        t.addRow("S:", self.label_s)
-        t.addRow("E:", self.label_e)
-        t.addRow("O:", self.label_w)
-        t.addRow("Modalità testo:", self.text_mode)
-        t.addRow("text_depth_mm:", self.text_depth_mm)
-        l.addWidget(text)
+        # Advanced sections start collapsed; their forms are built on first expansion.
+        def build_frame(fr: QFormLayout) -> None:
+            fr.addRow("Cornice separata:", self.separate_frame)
+            fr.addRow("Modalità:", self.flush_mode)
+            fr.addRow("Testi cornice:", self.frame_text_enabled)
+            fr.addRow("frame_wall_mm:", self.frame_wall_mm)
+            fr.addRow("frame_height_mm:", self.frame_height_mm)
+            fr.addRow("lip_depth_mm:", self.lip_depth_mm)
+            fr.addRow("clearance_mm:", self.clearance_mm)
+            fr.addRow("recess_mm:", self.recess_mm)
+            fr.addRow("lead_in_mm:", self.lead_in_mm)
+            fr.addRow("finger_notch_radius_mm:", self.finger_notch_radius_mm)
+            fr.addRow("rim_mm:", self.rim_mm)
+            fr.addRow("Test incastro:", self.test_mode)
+            fr.addRow("", self.test_mode_info)
+
+        def build_ams(a: QFormLayout) -> None:
+            a.addRow("AMS 4 colori:", self.ams_enabled)
+            a.addRow("Traccia inlay:", self.track_inlay_enabled)
+            a.addRow("groove_width_mm:", self.groove_width_mm)
+            a.addRow("groove_depth_mm:", self.groove_depth_mm)
+            a.addRow("groove_chamfer_mm:", self.groove_chamfer_mm)
+            a.addRow("track_clearance_mm:", self.track_clearance_mm)
+            a.addRow("track_relief_mm:", self.track_relief_mm)
+            a.addRow("track_top_radius_mm:", self.track_top_radius_mm)
+
+        def build_text(t: QFormLayout) -> None:
+            t.addRow("Titolo:", self.title_text)
+            t.addRow("Sottotitolo:", self.subtitle_text)
+            for letter, edit in self.compass_labels.items():
+                t.addRow(f"{letter}:", edit)
+            t.addRow("Modalità testo:", self.text_mode)
+            t.addRow("text_depth_mm:", self.text_depth_mm)
+
+        l.addWidget(LazyGroup("Cornice / Incastro", build_frame))
+        l.addWidget(LazyGroup("AMS + Traccia", build_ams))
+        l.addWidget(LazyGroup("Testi", build_text))
 
         l.addWidget(self.status)
         l.addStretch(1)
@@ -336,7 +523,7 @@ class MainWindow(QMainWindow):
         toggles.addStretch(1)
 
         r.addLayout(toggles)
-        r.addWidget(self.preview, 7)
+        r.addWidget(self._preview_slot, 7)
         r.addWidget(self.log, 3)
 
         bottom = QHBoxLayout()
@@ -345,8 +532,26 @@ class MainWindow(QMainWindow):
         r.addLayout(bottom)
         return right
 
+    def _ensure_preview(self) -> Preview3DWidget:
+        if self.preview is None:
+            from .preview3d import Preview3DWidget
+
+            self.preview = Preview3DWidget()
+            self._preview_slot.layout().addWidget(self.preview)
+        return self.preview
+
     def _append_log(self, text: str) -> None:
-        self.log.appendPlainText(text)
+        # Buffered: lines are appended in one batch per _LOG_FLUSH_MS (one relayout, not one per line).
+        self._log_buf.append(text)
+        if not self._log_timer.isActive():
+            self._log_timer.start()
+
+    def _flush_log(self) -> None:
+        if not self._log_buf:
+            return
+        lines = list(self._log_buf)
+        self._log_buf.clear()
+        self.log.appendPlainText("\n".join(lines))
 
     def _select_out_dir(self) -> None:
         path = QFileDialog.getExistingDirectory(self, "Seleziona cartella output")
@@ -365,6 +570,8 @@ class MainWindow(QMainWindow):
             self.out_dir.setText(str(Path(path).parent))
 
         try:
+            from ..core.pipeline import compute_gpx_bbox_lonlat
+
             min_lon, min_lat, max_lon, max_lat = compute_gpx_bbox_lonlat(path, margin_ratio=0.20)
             self._append_log(f"GPX caricato, bbox=[{min_lon:.4f}, {min_lat:.4f}, {max_lon:.4f}, {max_lat:.4f}]")
         except Exception as exc:  # noqa: BLE001
@@ -385,94 +592,138 @@ class MainWindow(QMainWindow):
         )
         if path:
             self.blender_exe_path.setText(path)
+            QSettings(*SETTINGS_KEY).setValue("blender_exe", path)
 
     def _auto_detect_blender_exe(self) -> None:
         if self.blender_exe_path.text().strip():
             return
 
-        import glob
-        import os
+        cached = QSettings(*SETTINGS_KEY).value("blender_exe")
+        if cached and Path(str(cached)).exists():
+            self.blender_exe_path.setText(str(cached))
+            self._append_log(f"Blender rilevato: {cached}")
+            return
+
         import platform
 
         if platform.system() != "Windows":
             return
 
-        direct_paths = [
-            r"C:\Program Files\Blender Foundation\Blender\blender.exe",
-            r"C:\Program Files (x86)\Blender Foundation\Blender\blender.exe",
-        ]
-        wildcard_patterns = [
-            r"C:\Program Files\Blender Foundation\Blender*\blender.exe",
-            r"C:\Program Files (x86)\Blender Foundation\Blender*\blender.exe",
-        ]
-
-        localappdata = os.environ.get("LOCALAPPDATA")
-        if localappdata:
-            wildcard_patterns.append(rf"{localappdata}\Programs\Blender Foundation\Blender*\blender.exe")
-
-        for p in direct_paths:
-            if Path(p).exists():
-                self.blender_exe_path.setText(p)
-                self._append_log(f"Blender rilevato: {p}")
-                return
+        # The directory scan runs off the GUI thread so the window paints first.
+        self._detect_worker = Worker(_find_blender_exe)
+        self._detect_worker.done.connect(self._on_blender_detected, _QUEUED)
+        self._start_worker(self._detect_worker)
 
-        for pat in wildcard_patterns:
-            matches = glob.glob(pat)
-            if matches:
-                found = sorted(matches)[-1]
-                self.blender_exe_path.setText(found)
-                self._append_log(f"Blender rilevato: {found}")
-                return
+    def _on_blender_detected(self, found: str | None) -> None:
+        self._detect_worker = None
+        if self.blender_exe_path.text().strip():
+            return
+        if found:
+            self.blender_exe_path.setText(found)
+            QSettings(*SETTINGS_KEY).setValue("blender_exe", found)
+            self._append_log(f"Blender rilevato: {found}")
+            return
 
         self._append_log("Blender non rilevato automaticamente. Usa 'Sfoglia' per selezionarlo.")
 
     # ---------- THREAD HELPERS ----------
 
-    def _run_background(self, fn, on_done, what: str) -> None:
-        if self._thread is not None:
-            QMessageBox.warning(self, "Operazione in corso", "Attendere il completamento dell'operazione corrente.")
+    def _start_worker(self, worker: Worker) -> None:
+        # Owned here until the thread ends: the task's own bookkeeping may drop it as soon as
+        # the result arrives, while run() is still returning.
+        self._threads.add(worker)
+        worker.finished.connect(self._on_thread_finished, _QUEUED)
+        worker.start()
+
+    def _on_thread_finished(self) -> None:
+        worker = self.sender()
+        worker.wait()
+        self._threads.discard(worker)
+
+    def _run_background(self, fn, on_done, what: str, with_progress: bool = False) -> None:
+        # One job per kind ("download DEM", "generazione"): different kinds run side by side, a
+        # request for a busy kind waits for it. Only the newest waiting request per kind is kept.
+        if what in self._jobs:
+            if what in self._pending_jobs:
+                self._append_log(f"[{what}] richiesta in coda sostituita dalla nuova")
+            else:
+                self._append_log(f"[{what}] in coda")
+            self._pending_jobs[what] = (fn, on_done, with_progress)
             return
 
-        self.progress.setRange(0, 0)
-        self.generate_btn.setEnabled(False)
-        self.download_dem_btn.setEnabled(False)
+        if with_progress:
+            self._progress_job = what
+            self._pending_progress = None
+        if with_progress or self._progress_job is None:
+            self.progress.setRange(0, 0)
         self._append_log(f"[{what}] avvio...")
         self._append_log("[thread] setup worker")  # DEBUG
 
-        self._thread = QThread(self)
-
         # IMPORTANTISSIMO: mantieni un riferimento, altrimenti il worker può sparire
-        self._worker = Worker(fn)
-        self._worker.moveToThread(self._thread)
-
-        self._worker.log.connect(self._append_log)
-
-        self._thread.started.connect(lambda: self._append_log("[thread] QThread started"))  # DEBUG
-        self._thread.started.connect(self._worker.run)
-
-        self._worker.finished.connect(lambda data: self._on_worker_done(data, on_done, what))
-        self._worker.failed.connect(lambda err: self._on_worker_error(err, what))
-        self._worker.finished.connect(self._thread.quit)
-        self._worker.failed.connect(self._thread.quit)
-
-        self._thread.finished.connect(self._worker.deleteLater)
-        self._thread.finished.connect(self._cleanup_thread)
-
-        self._thread.start()
-
-    def _cleanup_thread(self) -> None:
-        self._thread = None
-        self._worker = None
-        self.progress.setRange(0, 100)
-        self.progress.setValue(100)
-        self.generate_btn.setEnabled(True)
-        self.download_dem_btn.setEnabled(bool(self.gpx_path.text().strip()))
+        worker = Worker(fn)
+        if with_progress:
+            # fn gets progress_cb; the bar leaves busy mode at the first tick.
+            worker.kwargs["progress_cb"] = worker.progress.emit
+            worker.progress.connect(self._on_worker_progress, _QUEUED)
+        self._jobs[what] = (worker, on_done)
+
+        # Explicitly queued: emissions from the worker thread never run GUI code (log relayout) inline.
+        worker.log.connect(self._append_log, _QUEUED)
+        worker.done.connect(self._on_worker_done, _QUEUED)
+        worker.failed.connect(self._on_worker_error, _QUEUED)
+
+        self._start_worker(worker)
+
+    def _sender_job(self) -> str:
+        """Kind of the job whose worker emitted the signal being handled."""
+        sender = self.sender()
+        return next(what for what, (worker, _) in self._jobs.items() if worker is sender)
+
+    def _on_worker_progress(self, percent: int, message: str) -> None:
+        what = self._sender_job()
+        self._append_log(f"[{what}] {percent}% {message}")
+        if what != self._progress_job:
+            return
+        self._pending_progress = percent
+        if not self._progress_timer.isActive():
+            self._progress_timer.start()
 
-    def _on_worker_done(self, data, on_done, what: str) -> None:
+    def _flush_progress(self) -> None:
+        if self._pending_progress is None:
+            return
+        if self.progress.maximum() == 0:
+            self.progress.setRange(0, 100)
+        self.progress.setValue(self._pending_progress)
+        self._pending_progress = None
+
+    def _cleanup_worker(self, what: str) -> None:
+        self._jobs.pop(what, None)
+        if what == self._progress_job:
+            self._progress_job = None
+            self._pending_progress = None
+        pending = self._pending_jobs.pop(what, None)
+        if pending is not None:
+            fn, on_done, with_progress = pending
+            self._run_background(fn, on_done, what, with_progress)
+        elif not self._jobs:
+            self._pending_progress = None
+            self.progress.setRange(0, 100)
+            self.progress.setValue(100)
+        elif self._progress_job is None:
+            # Only jobs without percentages left (e.g. a DEM download): back to busy mode.
+            self.progress.setRange(0, 0)
+
+    def _on_worker_done(self, data) -> None:
+        what = self._sender_job()
+        on_done = self._jobs[what][1]
         self._append_log(f"[{what}] completato")
-        on_done(data)
+        try:
+            on_done(data)
+        finally:
+            self._cleanup_worker(what)
 
-    def _on_worker_error(self, err: str, what: str) -> None:
+    def _on_worker_error(self, err: str) -> None:
+        what = self._sender_job()
         self._append_log(f"[{what}] errore: {err}")
         self.status.setText("Errore")
         msg = QMessageBox(self)
@@ -481,7 +732,10 @@ class MainWindow(QMainWindow):
         msg.setText(f"Errore durante {what}.")
         msg.setInformativeText(err.splitlines()[0] if err else "Errore sconosciuto")
         msg.setDetailedText(err)
-        msg.exec()
+        try:
+            msg.exec()
+        finally:
+            self._cleanup_worker(what)
 
     # ---------- ACTIONS ----------
 
@@ -491,12 +745,22 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "GPX mancante", "Seleziona prima un GPX.")
             return
 
+        from ..core.dem_downloader import download_srtm_dem_for_bbox
+        from ..core.pipeline import compute_gpx_bbox_lonlat, default_dem_output_path_for_gpx
+
+        out_dem = default_dem_output_path_for_gpx(gpx)
+        if out_dem.exists() and out_dem.stat().st_size > 0:
+            # Nothing to fetch: skip the background task (the downloader would return at once).
+            self._append_log("DEM: file già presente, salto download.")
+            self.dem_path.setText(str(out_dem.resolve()))
+            self.status.setText("Download DEM completato")
+            return
+
         self.status.setText("Scarico DEM SRTM...")
 
         def task(log):
             log("[download DEM] task iniziato")  # DEBUG
             min_lon, min_lat, max_lon, max_lat = compute_gpx_bbox_lonlat(gpx, margin_ratio=0.20)
-            out_dem = default_dem_output_path_for_gpx(gpx)
             key = self.opentopo_key.text().strip() or None
             return download_srtm_dem_for_bbox(
                 min_lon, min_lat, max_lon, max_lat,
@@ -520,80 +784,119 @@ class MainWindow(QMainWindow):
             self.test_mode_info.setText("")
 
     def _apply_printer_profile_defaults(self, *_: object) -> None:
-        profile = str(self.printer_profile.currentData())
-        values = PRINTER_PROFILE_TO_VALUES.get(profile)
+        # userData is the stored Python str: look it up as is.
+        values = PRINTER_PROFILE_TO_VALUES.get(self.printer_profile.currentData())
         if values is None:
             return
         clearance, lead_in = values
-        self.clearance_mm.setText(f"{clearance:.2f}")
-        self.lead_in_mm.setText(f"{lead_in:.1f}")
+        # Rewriting an identical text would still drop the cached config.
+        for edit, text in ((self.clearance_mm, f"{clearance:.2f}"), (self.lead_in_mm, f"{lead_in:.1f}")):
+            if edit.text() != text:
+                edit.setText(text)
+
+    def _invalidate_config(self, *_: object) -> None:
+        # Runs per keystroke, deliberately undebounced: dropping the cache is one store (cheaper
+        # than restarting a QTimer), and the config is only re-parsed when actually needed.
+        self._config_cache = None
+
+    def _schedule_relief_estimate(self, *_: object) -> None:
+        self._last_relief_mm = None
+        self._relief_timer.start()
+
+    def _estimate_relief_async(self) -> None:
+        gpx = self.gpx_path.text().strip()
+        dem = self.dem_path.text().strip()
+        self._relief_serial += 1
+        release_dems = dem != self._relief_dem
+        self._relief_dem = dem
+        inputs_ready = gpx and dem and Path(gpx).is_file() and Path(dem).is_file()
+        if not inputs_ready and not release_dems:
+            self.relief_estimate.setText("Rilievo massimo stimato (mm): n/d")
+            return
+        # The estimate is cached in the core: the next generation with these inputs reuses it.
+        worker = Worker(
+            _estimate_relief_task, self._relief_serial, gpx, dem, self._build_config(), release_dems
+        )
+        worker.done.connect(self._on_relief_estimated, _QUEUED)
+        self._relief_workers[self._relief_serial] = worker
+        self._start_worker(worker)
+
+    def _on_relief_estimated(self, result: tuple[int, float | None]) -> None:
+        serial, relief = result
+        self._relief_workers.pop(serial, None)
+        # Inputs changed again meanwhile: a newer estimate is on its way.
+        if serial != self._relief_serial:
+            return
+        if relief is None:
+            # Unreadable inputs: don't leave the previous inputs' value on screen.
+            self.relief_estimate.setText("Rilievo massimo stimato (mm): n/d")
+        else:
+            self._last_relief_mm = relief
+            self.relief_estimate.setText(f"Rilievo massimo stimato (mm): {relief:.2f}")
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        from ..core.dem_io import close_all
+
+        # A QThread must not be destroyed while running: let the running tasks end first.
+        for worker in list(self._threads):
+            worker.wait()
+        # Release the cached DEM files (locked on Windows while open).
+        close_all()
+        super().closeEvent(event)
 
     def _build_config(self) -> GenerateConfig:
+        if self._config_cache is None:
+            self._config_cache = self._read_config()
+        return self._config_cache
+
+    def _read_config(self) -> GenerateConfig:
+        from ..core.pipeline import GenerateConfig
+
         return GenerateConfig(
-            model_width_mm=float(self.size_x.text()),
-            model_height_mm=float(self.size_y.text()),
-            base_thickness_mm=float(self.base_mm.text()),
-            vertical_scale=float(self.vertical_scale.text()),
-            track_height_mm=float(self.track_height.text()),
-            grid_res=QUALITY_TO_GRID.get(str(self.quality.currentData()), 400),
+            model_width_mm=self.size_x.value,
+            model_height_mm=self.size_y.value,
+            base_thickness_mm=self.base_mm.value,
+            vertical_scale=self.vertical_scale.value,
+            track_height_mm=self.track_height.value,
+            grid_res=QUALITY_TO_GRID.get(self.quality.currentData(), 400),
             separate_frame=self.separate_frame.isChecked(),
             frame_text_enabled=self.frame_text_enabled.isChecked(),
-            frame_wall_mm=float(self.frame_wall_mm.text()),
-            frame_height_mm=float(self.frame_height_mm.text()),
-            lip_depth_mm=float(self.lip_depth_mm.text()),
-            clearance_mm=float(self.clearance_mm.text()),
+            frame_wall_mm=self.frame_wall_mm.value,
+            frame_height_mm=self.frame_height_mm.value,
+            lip_depth_mm=self.lip_depth_mm.value,
+            clearance_mm=self.clearance_mm.value,
             text_mode=str(self.text_mode.currentData()),
-            text_depth_mm=float(self.text_depth_mm.text()),
+            text_depth_mm=self.text_depth_mm.value,
             title_text=self.title_text.text(),
             subtitle_text=self.subtitle_text.text(),
-            label_n=self.label_n.text() or "N",
-            label_s=self.label_s.text() or "S",
-            label_e=self.label_e.text() or "E",
-            label_w=self.label_w.text() or "O",
+            **{field: self.compass_labels[letter].text() or letter for letter, field in _COMPASS_LABEL_FIELDS},
             flush_mode=str(self.flush_mode.currentData()),
-            recess_mm=float(self.recess_mm.text()),
-            lead_in_mm=float(self.lead_in_mm.text()),
-            finger_notch_radius_mm=float(self.finger_notch_radius_mm.text()),
-            rim_mm=float(self.rim_mm.text()),
+            recess_mm=self.recess_mm.value,
+            lead_in_mm=self.lead_in_mm.value,
+            finger_notch_radius_mm=self.finger_notch_radius_mm.value,
+            rim_mm=self.rim_mm.value,
             printer_profile=str(self.printer_profile.currentData()),
             test_mode=self.test_mode.isChecked(),
             test_size_mm=40.0,
             ams_enabled=self.ams_enabled.isChecked(),
             track_inlay_enabled=self.track_inlay_enabled.isChecked(),
-            groove_width_mm=float(self.groove_width_mm.text()),
-            groove_depth_mm=float(self.groove_depth_mm.text()),
-            groove_chamfer_mm=float(self.groove_chamfer_mm.text()),
-            track_clearance_mm=float(self.track_clearance_mm.text()),
-            track_relief_mm=float(self.track_relief_mm.text()),
-            track_top_radius_mm=float(self.track_top_radius_mm.text()),
+            groove_width_mm=self.groove_width_mm.value,
+            groove_depth_mm=self.groove_depth_mm.value,
+            groove_chamfer_mm=self.groove_chamfer_mm.value,
+            track_clearance_mm=self.track_clearance_mm.value,
+            track_relief_mm=self.track_relief_mm.value,
+            track_top_radius_mm=self.track_top_radius_mm.value,
+            reuse_blender_process=self.reuse_blender.isChecked(),
+            use_inprocess_bpy=self.inprocess_bpy.isChecked(),
         )
 
-    def _collect_preview_paths(
-        self, base_out: Path, config: GenerateConfig
-    ) -> list[tuple[Path, tuple[float, float, float, float], str]]:
-        stem = base_out.stem
-        prefix = "_test_" if config.test_mode else "_"
-
-        out = [
-            (base_out.with_name(stem + prefix + "base_brown.stl"), (0.47, 0.31, 0.18, 1.0), "base"),
-        ]
-
-        if self.show_ams.isChecked():
-            out.extend(
-                [
-                    (base_out.with_name(stem + prefix + "water.stl"), (0.2, 0.45, 0.95, 0.95), "water"),
-                    (base_out.with_name(stem + prefix + "green.stl"), (0.18, 0.70, 0.25, 0.95), "green"),
-                    (base_out.with_name(stem + prefix + "detail.stl"), (0.9, 0.87, 0.78, 0.95), "detail"),
-                ]
-            )
-
-        if self.show_track.isChecked():
-            out.append((base_out.with_name(stem + prefix + "track_inlay_red.stl"), (0.9, 0.1, 0.1, 1.0), "track"))
-
-        if config.separate_frame and self.show_frame.isChecked():
-            out.append((base_out.with_name(stem + prefix + "frame.stl"), (0.6, 0.6, 0.62, 0.9), "frame"))
+    def _preview_layer_switches(self) -> dict[str, QCheckBox]:
+        return {"ams": self.show_ams, "track": self.show_track, "frame": self.show_frame}
 
-        return out
+    def _on_preview_layer_toggled(self, layer: str, visible: bool) -> None:
+        # Parts stay loaded: toggling is a visibility flag, not a reload.
+        if self.preview is not None:
+            self.preview.set_layer_visible(layer, visible)
 
     def _load_preview_from_outputs(self) -> None:
         if self._last_output_base is None:
@@ -604,18 +907,56 @@ class MainWindow(QMainWindow):
             )
             return
 
-        cfg = self._build_config()
-        self.preview.clear()
-        for path, color, name in self._collect_preview_paths(self._last_output_base, cfg):
-            if not path.exists():
+        self._ensure_preview().clear()
+        # A newer request supersedes parts still being parsed for an older one.
+        self._preview_batch += 1
+        batch = self._preview_batch
+        started = False
+        # All parts sit next to the output base: one directory listing instead of a stat per part.
+        try:
+            with os.scandir(self._last_output_base.parent) as entries:
+                present = {entry.name for entry in entries}
+        except OSError:
+            present = set()
+        for path, color, name, layer in _preview_part_paths(self._last_output_base, *self._last_output_layout):
+            if path.name not in present:
                 self._append_log(f"anteprima: file non trovato ({name}) -> {path}")
                 continue
-            try:
-                self.preview.load_stl(path, color=color)
-                self._append_log(f"anteprima: caricato {name}")
-            except Exception as exc:  # noqa: BLE001
-                self._append_log(f"anteprima: errore su {name}: {exc}")
-        self.preview.frame_all()
+            # STL parsing runs on worker threads; only the GL upload happens on the GUI thread.
+            worker = Worker(_parse_preview_part, batch, path, color, name, layer)
+            worker.done.connect(self._on_preview_part_ready, _QUEUED)
+            self._preview_workers[(batch, name)] = worker
+            self._start_worker(worker)
+            started = True
+
+        if not started:
+            self.preview.frame_all()
+
+    def _on_preview_part_ready(self, part) -> None:
+        batch, name, color, layer, mesh, err = part
+        # Workers are referenced until they report back, even for a superseded batch.
+        self._preview_workers.pop((batch, name), None)
+        if batch != self._preview_batch:
+            return
+        if err is not None:
+            self._append_log(f"anteprima: errore su {name}: {err}")
+        else:
+            switch = self._preview_layer_switches().get(layer)
+            visible = switch is None or switch.isChecked()
+            vertices, faces, bounds, normals = mesh
+            self.preview.upload_mesh(
+                vertices, faces, color=color, layer=layer, visible=visible, bounds=bounds, name=name, normals=normals
+            )
+            self._append_log(f"anteprima: caricato {name}")
+
+        if not any(key[0] == batch for key in self._preview_workers):
+            self.preview.frame_all()
+
+    def _warn_high_relief(self, text: str) -> None:
+        # Informational only: shown without blocking, so generation and preview carry on behind it.
+        msg = QMessageBox(QMessageBox.Icon.Warning, "Warning rilievo alto", text, parent=self)
+        msg.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        msg.open()
 
     def _generate(self) -> None:
         gpx = self.gpx_path.text().strip()
@@ -623,27 +964,28 @@ class MainWindow(QMainWindow):
         if not gpx or not dem:
             QMessageBox.warning(self, "Input mancanti", "Seleziona sia GPX che DEM.")
             return
+        gpx_file = Path(gpx)
+        # The path fields are editable: catch a mistyped path here, not as a worker error.
+        missing = [p for p in (gpx_file, Path(dem)) if not p.is_file()]
+        if missing:
+            QMessageBox.warning(self, "File non trovato", "\n".join(str(p) for p in missing))
+            return
 
-        out_dir = Path(self.out_dir.text().strip() or Path(gpx).parent)
+        out_dir = Path(self.out_dir.text().strip() or gpx_file.parent)
         out_dir.mkdir(parents=True, exist_ok=True)
-        output_base = out_dir / Path(gpx).stem
+        output_base = out_dir / gpx_file.stem
         output_path = str(output_base.with_suffix(".stl"))
 
         self._append_log(f"Output dir: {out_dir}")
         self._append_log(f"Output base: {output_base}")
 
+        from ..core.pipeline import estimate_relief_mm, run_pipeline
+
         config = self._build_config()
-        try:
-            relief_mm = estimate_relief_mm(gpx, dem, config)
-            self.relief_estimate.setText(f"Rilievo massimo stimato (mm): {relief_mm:.2f}")
-            if relief_mm > 60.0:
-                QMessageBox.warning(
-                    self,
-                    "Warning rilievo alto",
-                    f"Rilievo stimato: {relief_mm:.2f} mm (> 60 mm).\nLa generazione continua comunque.",
-                )
-        except Exception as exc:  # noqa: BLE001
-            self._append_log(f"stima rilievo non disponibile: {exc}")
+        # Usually already estimated in the background while the inputs were edited.
+        relief_mm = self._last_relief_mm
+        if relief_mm is not None and relief_mm > 60.0:
+            self._warn_high_relief(f"Rilievo stimato: {relief_mm:.2f} mm (> 60 mm).\nLa generazione continua comunque.")
 
         backend_value = str(self.backend.currentData())
         blender_path = self.blender_exe_path.text().strip() or None
@@ -665,14 +1007,23 @@ class MainWindow(QMainWindow):
 
         export_3mf_enabled = self.export_3mf.isChecked()
 
-        def task() -> tuple[Path, Path | None, str | None]:
-            run_pipeline(
+        def task(log, progress_cb) -> tuple[Path, Path | None, str | None, float | str | None]:
+            # Not estimated yet: read GPX + DEM here, off the GUI thread. A failure is reported, not fatal.
+            relief: float | str | None = None
+            if relief_mm is None:
+                try:
+                    relief = estimate_relief_mm(gpx, dem, config)
+                except Exception as exc:  # noqa: BLE001
+                    relief = str(exc)
+
+            meshes = run_pipeline(
                 gpx_path=gpx,
                 dem_path=dem,
                 stl_output_path=output_path,
                 config=config,
                 backend=backend_value,
                 blender_exe_path=blender_path,
+                progress_cb=progress_cb,
             )
 
             out_base = Path(output_path)
@@ -681,17 +1032,28 @@ class MainWindow(QMainWindow):
             export_err: str | None = None
             if export_3mf_enabled:
                 try:
-                    from ..export_3mf import create_3mf_from_stl_output_base
+                    from ..export_3mf import create_3mf_from_meshes, create_3mf_from_stl_output_base
 
-                    out_3mf = create_3mf_from_stl_output_base(out_base, test_mode=config.test_mode)
+                    if meshes:
+                        out_3mf = create_3mf_from_meshes(out_base, meshes, test_mode=config.test_mode)
+                    else:
+                        out_3mf = create_3mf_from_stl_output_base(out_base, test_mode=config.test_mode)
                 except Exception as exc:  # noqa: BLE001
                     export_err = str(exc)
 
-            return out_base, out_3mf, export_err
-
-        def done(result: tuple[Path, Path | None, str | None]) -> None:
-            out_base, out_3mf, export_err = result
+            return out_base, out_3mf, export_err, relief
+
+        def done(result: tuple[Path, Path | None, str | None, float | str | None]) -> None:
+            out_base, out_3mf, export_err, relief = result
+            # None: the estimate was already shown (and warned about) before the run.
+            if isinstance(relief, str):
+                self._append_log(f"stima rilievo non disponibile: {relief}")
+            elif relief is not None:
+                self.relief_estimate.setText(f"Rilievo massimo stimato (mm): {relief:.2f}")
+                if relief > 60.0:
+                    self._warn_high_relief(f"Rilievo stimato: {relief:.2f} mm (> 60 mm).")
             self._last_output_base = out_base
+            self._last_output_layout = (config.test_mode, config.separate_frame)
             self.status.setText("Generazione completata")
             self._append_log(f"output base: {out_base}")
 
@@ -702,4 +1064,4 @@ class MainWindow(QMainWindow):
 
             self._load_preview_from_outputs()
 
-        self._run_background(task, done, "generazione")
+        self._run_background(task, done, "generazione", with_progress=True)
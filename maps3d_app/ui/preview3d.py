@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-from pathlib import Path
-
 import numpy as np
 import pyqtgraph.opengl as gl
-import trimesh
 from PySide6.QtWidgets import QVBoxLayout, QWidget
 
+from .stl_mesh import mesh_bounds
+
 
 class Preview3DWidget(QWidget):
     def __init__(self, parent: QWidget | None = None) -> None:
@@ -20,8 +19,13 @@ class Preview3DWidget(QWidget):
         layout.addWidget(self.view)
 
         self._items: list[gl.GLMeshItem] = []
-        self._mins: list[np.ndarray] = []
-        self._maxs: list[np.ndarray] = []
+        # Items by layer name, for show/hide without reloading.
+        self._layers: dict[str, list[gl.GLMeshItem]] = {}
+        # Items by part name: kept (hidden) across clear() and refilled by the next upload.
+        self._parts: dict[str, gl.GLMeshItem] = {}
+        # Running bounds of everything uploaded: frame_all doesn't rescan any mesh.
+        self._bounds_min: np.ndarray | None = None
+        self._bounds_max: np.ndarray | None = None
 
         grid = gl.GLGridItem()
         grid.setSize(200, 200)
@@ -33,32 +37,72 @@ class Preview3DWidget(QWidget):
         self.view.addItem(axis)
 
     def clear(self) -> None:
+        kept = {id(item) for item in self._parts.values()}
         for item in self._items:
-            self.view.removeItem(item)
+            if id(item) in kept:
+                item.setVisible(False)
+            else:
+                self.view.removeItem(item)
         self._items.clear()
-        self._mins.clear()
-        self._maxs.clear()
+        self._layers.clear()
+        self._bounds_min = None
+        self._bounds_max = None
+
+    def upload_mesh(
+        self,
+        vertices: np.ndarray,
+        faces: np.ndarray,
+        color: tuple[float, float, float, float],
+        smooth: bool = True,
+        layer: str | None = None,
+        visible: bool = True,
+        bounds: tuple[np.ndarray, np.ndarray] | None = None,
+        name: str | None = None,
+        normals: np.ndarray | None = None,
+    ) -> None:
+        """Add a mesh to the view.
 
-    def load_stl(self, path: str | Path, color: tuple[float, float, float, float], smooth: bool = True) -> None:
-        mesh = trimesh.load(path, force="mesh")
-        if not isinstance(mesh, trimesh.Trimesh):
-            raise ValueError(f"File STL non valido: {path}")
-        vertices = np.asarray(mesh.vertices, dtype=np.float32)
-        faces = np.asarray(mesh.faces, dtype=np.uint32)
+        Pass ``bounds`` (see mesh_bounds) and, for smooth shading, ``normals`` (see vertex_normals)
+        when computed off the GUI thread: otherwise pyqtgraph computes the normals at first paint.
+
+        A named part reuses the item of the previous upload under that name (mesh data swapped
+        in place) instead of adding a new one.
+        """
         md = gl.MeshData(vertexes=vertices, faces=faces)
-        item = gl.GLMeshItem(meshdata=md, smooth=smooth, shader="shaded", color=color, drawEdges=False)
-        self.view.addItem(item)
+        if normals is not None and smooth:
+            # Seed MeshData's normal cache: vertexNormals() would recompute them in a Python loop.
+            md._vertexNormals = normals
+        item = self._parts.get(name) if name is not None else None
+        if item is None:
+            item = gl.GLMeshItem(meshdata=md, smooth=smooth, shader="shaded", color=color, drawEdges=False)
+            self.view.addItem(item)
+            if name is not None:
+                self._parts[name] = item
+        else:
+            item.setMeshData(meshdata=md, smooth=smooth)
+            item.setColor(color)
+        item.setVisible(visible)
         self._items.append(item)
-        self._mins.append(vertices.min(axis=0))
-        self._maxs.append(vertices.max(axis=0))
+        if layer is not None:
+            self._layers.setdefault(layer, []).append(item)
+        mins, maxs = bounds if bounds is not None else mesh_bounds(vertices)
+        if self._bounds_min is None:
+            self._bounds_min, self._bounds_max = mins, maxs
+        else:
+            self._bounds_min = np.minimum(self._bounds_min, mins)
+            self._bounds_max = np.maximum(self._bounds_max, maxs)
+
+    def set_layer_visible(self, layer: str, visible: bool) -> None:
+        """Show or hide the meshes uploaded under ``layer`` (no-op if none are loaded)."""
+        for item in self._layers.get(layer, ()):
+            item.setVisible(visible)
 
     def frame_all(self) -> None:
-        if not self._mins:
+        if self._bounds_min is None:
             return
-        mins = np.min(np.vstack(self._mins), axis=0)
-        maxs = np.max(np.vstack(self._maxs), axis=0)
+        mins = self._bounds_min
+        maxs = self._bounds_max
         center = (mins + maxs) / 2.0
         size = max(float(np.max(maxs - mins)), 1.0)
-        self.view.opts["center"] = gl.Vector(center[0], center[1], center[2])
-        self.view.opts["distance"] = size * 2.2
-        self.view.update()
+        # One call: sets center and distance, then schedules a single repaint.
+        self.view.setCameraPosition(pos=gl.Vector(*center), distance=size * 2.2)
@@ -0,0 +1,204 @@
+"""STL reading for the 3D preview: plain NumPy, no GL, safe on worker threads."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional: vertices are welded with a NumPy sort instead
+    njit = None
+
+# Above this many triangles, preview meshes are decimated (the STL on disk is untouched).
+PREVIEW_MAX_FACES = 500_000
+
+# Binary STL triangle record (50 bytes): normal, 3 vertices, attribute byte count.
+_STL_TRIANGLE = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _weld_hashed(bits: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Open-addressing hash on the raw float bits: O(n), no sort.
+        n = bits.shape[0]
+        cap = 1
+        while cap < 2 * n:
+            cap *= 2
+        mask = cap - 1
+        table = np.full(cap, -1, np.int64)
+        first = np.empty(n, np.int64)
+        inverse = np.empty(n, np.int64)
+        count = 0
+        for i in range(n):
+            h = np.uint64(bits[i, 0]) * np.uint64(73856093)
+            h ^= np.uint64(bits[i, 1]) * np.uint64(19349663)
+            h ^= np.uint64(bits[i, 2]) * np.uint64(83492791)
+            h = (h ^ (h >> np.uint64(29))) * np.uint64(0xBF58476D1CE4E5B9)
+            j = np.int64(h >> np.uint64(16)) & mask
+            while True:
+                k = table[j]
+                if k == -1:
+                    table[j] = count
+                    first[count] = i
+                    inverse[i] = count
+                    count += 1
+                    break
+                f = first[k]
+                if bits[f, 0] == bits[i, 0] and bits[f, 1] == bits[i, 1] and bits[f, 2] == bits[i, 2]:
+                    inverse[i] = k
+                    break
+                j = (j + 1) & mask
+        return first[:count].copy(), inverse
+
+    @njit(cache=True)
+    def _bounds_one_pass(vertices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        lo = vertices[0].copy()
+        hi = vertices[0].copy()
+        for i in range(1, vertices.shape[0]):
+            for k in range(3):
+                x = vertices[i, k]
+                if x < lo[k]:
+                    lo[k] = x
+                elif x > hi[k]:
+                    hi[k] = x
+        return lo, hi
+
+    @njit(cache=True)
+    def _accumulate_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+        normals = np.zeros(vertices.shape, np.float32)
+        for i in range(faces.shape[0]):
+            a, b, c = faces[i, 0], faces[i, 1], faces[i, 2]
+            e1x = vertices[b, 0] - vertices[a, 0]
+            e1y = vertices[b, 1] - vertices[a, 1]
+            e1z = vertices[b, 2] - vertices[a, 2]
+            e2x = vertices[c, 0] - vertices[a, 0]
+            e2y = vertices[c, 1] - vertices[a, 1]
+            e2z = vertices[c, 2] - vertices[a, 2]
+            nx = e1y * e2z - e1z * e2y
+            ny = e1z * e2x - e1x * e2z
+            nz = e1x * e2y - e1y * e2x
+            for j in (a, b, c):
+                normals[j, 0] += nx
+                normals[j, 1] += ny
+                normals[j, 2] += nz
+        return normals
+
+
+def _weld_sorted(bits: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    key_xy = (bits[:, 0].astype(np.uint64) << np.uint64(32)) | bits[:, 1]
+    key_z = bits[:, 2]
+    order = np.lexsort((key_z, key_xy))
+    sorted_xy = key_xy[order]
+    sorted_z = key_z[order]
+    is_new = np.empty(len(order), dtype=bool)
+    is_new[0] = True
+    np.not_equal(sorted_xy[1:], sorted_xy[:-1], out=is_new[1:])
+    is_new[1:] |= sorted_z[1:] != sorted_z[:-1]
+    inverse = np.empty(len(order), dtype=np.int64)
+    inverse[order] = np.cumsum(is_new) - 1
+    return order[is_new], inverse
+
+
+def _weld_corners(corners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Weld (n*3, 3) float32 triangle corners into (vertices, uint32 faces)."""
+    # Shared corners are bit-identical in our STLs: weld on exact float bits.
+    bits = corners.view(np.uint32)
+    first, inverse = _weld_hashed(bits) if njit is not None else _weld_sorted(bits)
+    return corners[first], inverse.astype(np.uint32).reshape(-1, 3)
+
+
+def _read_binary_stl(path: Path) -> tuple[np.ndarray, np.ndarray] | None:
+    """Parse a binary STL into welded (float32 vertices, uint32 faces); None if not binary STL."""
+    with path.open("rb") as fh:
+        header = fh.read(84)
+    if len(header) < 84:
+        return None
+    count = int(np.frombuffer(header, dtype="<u4", count=1, offset=80)[0])
+    if count == 0 or path.stat().st_size != 84 + count * _STL_TRIANGLE.itemsize:
+        return None
+
+    # Mapped, not read: only the vertex fields are copied out of the file.
+    records = np.memmap(path, dtype=_STL_TRIANGLE, mode="r", offset=84, shape=(count,))
+    corners = np.ascontiguousarray(records["vertices"]).reshape(-1, 3)
+    del records
+    return _weld_corners(corners)
+
+
+def mesh_bounds(vertices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-axis (min, max) of an (n, 3) vertex array."""
+    if njit is not None:
+        return _bounds_one_pass(vertices)
+    # Per column: NumPy's axis-0 reduction over 3-wide rows is several times slower.
+    return (
+        np.array([vertices[:, k].min() for k in range(3)], dtype=vertices.dtype),
+        np.array([vertices[:, k].max() for k in range(3)], dtype=vertices.dtype),
+    )
+
+
+def vertex_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Smooth-shading vertex normals: area-weighted face normals summed per vertex, normalized.
+
+    Same result as pyqtgraph's ``MeshData.vertexNormals``, which loops over vertices in Python.
+    """
+    if njit is not None:
+        normals = _accumulate_normals(vertices, faces)
+    else:
+        tri = vertices[faces]
+        face_normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        corners = faces.ravel()
+        normals = np.empty_like(vertices)
+        for k in range(3):
+            weights = np.repeat(face_normals[:, k], 3)
+            normals[:, k] = np.bincount(corners, weights=weights, minlength=len(vertices))
+    length = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+    length[length == 0] = 1.0
+    normals /= length[:, None]
+    return normals
+
+
+def decimate_for_preview(
+    vertices: np.ndarray, faces: np.ndarray, max_faces: int = PREVIEW_MAX_FACES
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vertex-clustering decimation to roughly ``max_faces`` triangles; small meshes pass through.
+
+    Vertices are merged per cubic cell (sized from the surface area, ~2 triangles per cell
+    face) at their mean position, and collapsed triangles dropped. Coarse but fast, and
+    fine at preview distances for the dense terrain grids.
+    """
+    if len(faces) <= max_faces:
+        return vertices, faces
+    tri = vertices[faces]
+    area = 0.5 * float(np.linalg.norm(np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]), axis=1).sum())
+    del tri
+    cell = np.sqrt(2.0 * area / max_faces)
+    lo = vertices.min(axis=0)
+    q = np.floor((vertices - lo) / cell).astype(np.int64)
+    dims = q.max(axis=0) + 1
+    _, inverse = np.unique((q[:, 0] * dims[1] + q[:, 1]) * dims[2] + q[:, 2], return_inverse=True)
+    count = int(inverse.max()) + 1
+    members = np.bincount(inverse, minlength=count)
+    merged = np.empty((count, 3), dtype=np.float32)
+    for k in range(3):
+        merged[:, k] = np.bincount(inverse, weights=vertices[:, k], minlength=count) / members
+    f = inverse[faces]
+    keep = (f[:, 0] != f[:, 1]) & (f[:, 1] != f[:, 2]) & (f[:, 0] != f[:, 2])
+    return merged, f[keep].astype(np.uint32)
+
+
+def read_stl_mesh(path: str | Path) -> tuple[np.ndarray, np.ndarray]:
+    """Read an STL into (float32 vertices, uint32 faces)."""
+    welded = _read_binary_stl(Path(path))
+    if welded is not None:
+        return welded
+
+    # ASCII (or otherwise unusual) STL: trimesh parses it; no processing, the weld is ours.
+    import trimesh
+
+    mesh = trimesh.load_mesh(path, process=False)
+    if not isinstance(mesh, trimesh.Trimesh):
+        raise ValueError(f"File STL non valido: {path}")
+    corners = np.asarray(mesh.vertices, dtype=np.float32)[mesh.faces].reshape(-1, 3)
+    return _weld_corners(corners)